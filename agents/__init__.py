@@ -3,10 +3,26 @@ Agents package for EnvAgent.
 Contains AI agents for project analysis and environment building.
 """
 
-from .env_builder import EnvironmentBuilder
-from .env_fixer import EnvironmentFixer
-from .decision_agent import DecisionAgent
-from .code_scanner import CodeScannerAgent
+import importlib
+
+# Agents are imported on first access (PEP 562), so importing one agent
+# module does not load all the others.
+_LAZY_AGENTS = {
+    "EnvironmentBuilder": ".env_builder",
+    "EnvironmentFixer": ".env_fixer",
+    "DecisionAgent": ".decision_agent",
+    "CodeScannerAgent": ".code_scanner",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_AGENTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     "ProjectAnalyzer",
@@ -5,14 +5,53 @@ Now supports .py and .ipynb files.
 """
 
 import ast
+import hashlib
 import json
 import logging
+import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Set, Tuple, Optional
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Set, Tuple, Optional
+
+from utils.helpers import loads_json
 
 logger = logging.getLogger(__name__)
 
+
+# Content digest -> imports found in that source, shared by every scan in this process and
+# optionally persisted between runs (imports_cache_path). Identical files (vendored copies,
+# rescans, unchanged files after a fresh clone) skip the AST work; values are small frozensets.
+_IMPORTS_CACHE: Dict[bytes, FrozenSet[str]] = {}
+_IMPORTS_CACHE_MAX = 65536
+# Entries computed since the last save (or since the last hand-off from a pool worker)
+_NEW_IMPORTS: Dict[bytes, FrozenSet[str]] = {}
+# Persistent cache files already merged into _IMPORTS_CACHE in this process
+_LOADED_IMPORT_CACHES: Set[str] = set()
+
+# Scanner used by process-pool workers (one per worker process, see _init_scan_worker)
+_worker_scanner = None
+
+
+def _init_scan_worker(output_dir: str, imports_cache_path: Optional[str]) -> None:
+    global _worker_scanner
+    _NEW_IMPORTS.clear()  # a forked worker inherits the parent's unsaved entries; the parent already has them
+    _worker_scanner = CodeScannerAgent(output_dir, imports_cache_path)
+    _worker_scanner._load_imports_cache()
+
+
+def _scan_file_in_worker(file_path: Path) -> Tuple[Tuple[Set[str], bool], Dict[bytes, FrozenSet[str]]]:
+    """
+    Module-level so it can be pickled into a ProcessPoolExecutor.
+    Also returns the import-cache entries this file added, so the parent process can persist them.
+    """
+    result = _worker_scanner._scan_for_summary(file_path)
+    new_entries = dict(_NEW_IMPORTS)
+    _NEW_IMPORTS.clear()
+    return result, new_entries
+
+
 class CodeScannerAgent:
     """
     Analyzes source code to extract import statements and detect CUDA usage.
@@ -20,7 +59,8 @@ class CodeScannerAgent:
 
     # Expanded Standard Library List (Python 3.8+)
     # These should NOT appear in requirements.txt
-    STD_LIB = set(sys.builtin_module_names) | {
+    # On 3.10+ sys.stdlib_module_names covers the full stdlib; the manual list backs up older versions
+    STD_LIB = frozenset(sys.builtin_module_names) | frozenset(getattr(sys, 'stdlib_module_names', ())) | frozenset({
         'abc', 'argparse', 'ast', 'asyncio', 'base64', 'collections', 'copy', 'csv',
         'datetime', 'decimal', 'distutils', 'email', 'enum', 'functools', 'glob',
         'gzip', 'hashlib', 'html', 'http', 'importlib', 'inspect', 'io', 'json',
@@ -29,58 +69,202 @@ class CodeScannerAgent:
         'stat', 'string', 'subprocess', 'sys', 'tempfile', 'threading', 'time',
         'timeit', 'typing', 'unittest', 'urllib', 'uuid', 'warnings', 'weakref',
         'xml', 'zipfile', 'zoneinfo'
-    }
+    })
 
-    def __init__(self, output_dir: str):
+    # Module part of 'import x, y as z' / 'from x import y' at the start of a line.
+    # Fallback for sources ast.parse rejects only: it also matches import lines inside strings.
+    _IMPORT_RE = re.compile(
+        r'^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import|import[ \t]+([\w., \t]+))',
+        re.MULTILINE
+    )
+
+    # Notebook-only syntax: '%%bash' cell magics (the cell body is not Python unless listed below),
+    # and '%pip install x' / '!ls' lines
+    _CELL_MAGIC_RE = re.compile(r'[ \t]*%%(\w+)[^\n]*\n?')
+    _MAGIC_LINE_RE = re.compile(r'^([ \t]*)(?=[%!])', re.MULTILINE)
+    PYTHON_CELL_MAGICS = frozenset({'time', 'timeit', 'capture', 'prun', 'debug'})
+
+    # AST fields that hold nested statements (except handlers and match cases carry their own body)
+    _BODY_FIELDS = ('body', 'orelse', 'finalbody', 'handlers', 'cases')
+
+    # GPU keywords ('tensorflow-gpu' is covered by 'gpu'); IGNORECASE avoids a lowered copy of every file
+    _CUDA_RE = re.compile(r'cuda|gpu|torch\.device', re.IGNORECASE)
+
+    # Config files whose text is passed on as context for the environment builder
+    HINT_FILES = ['requirements.txt', 'setup.py', 'pyproject.toml', 'Pipfile']
+
+    # Read caps: imports sit near the top of a module, and hints are clipped to 3000 chars anyway
+    MAX_SOURCE_BYTES = 512 * 1024
+    MAX_HINT_BYTES = 32 * 1024
+    # Characters of each config file quoted in the summary
+    MAX_HINT_CHARS = 3000
+
+    # Past this many source files, regex/AST work (which holds the GIL) is spread over processes;
+    # smaller repos don't repay the worker start-up and stay on threads
+    PROCESS_POOL_MIN_FILES = 2000
+    PROCESS_POOL_CHUNKSIZE = 32
+
+    # Summary cache: bump CACHE_VERSION whenever the summary format or scan logic changes
+    CACHE_VERSION = 2
+    FINGERPRINT_PREFIX = "# Fingerprint: "
+
+    def __init__(self, output_dir: str, imports_cache_path: Optional[str] = None):
+        """
+        `imports_cache_path` (optional) is a JSON file where per-file import results are kept
+        between runs, keyed by content digest; without it the cache lives only in memory.
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.imports_cache_path = Path(imports_cache_path) if imports_cache_path else None
+        # Set once any file of the running scan_files call mentions CUDA; later files then skip the keyword search
+        self._cuda_detected = False
+        # Hint file name -> content from the last scan_files call, for later agents to reuse
+        self.config_blobs: Dict[str, str] = {}
 
-    def scan_files(self, file_paths: List[Path], root_dir: Path, project_name: str) -> Path:
+    def scan_files(self, file_paths: List[Path], root_dir: Path, project_name: str,
+                   hint_files: Optional[List[Path]] = None) -> Path:
         """
         Main entry point: Scans a list of files for dependencies.
+        Config hints come from `hint_files`, defaulting to the HINT_FILES among `file_paths` that sit
+        at the top of `root_dir` (FileFilter always includes them; nested copies, e.g. test fixtures,
+        are not read). Their contents stay available in `self.config_blobs` afterwards.
         """
         all_imports = set()
         cuda_required = False
-        dependency_hints = []
 
         logger.info(f"🔬 Static Analysis: Scanning {len(file_paths)} files in {root_dir.name}...")
 
-        for file_path in file_paths:
-            try:
-                # 1. Analyze Source Code (.py & .ipynb)
-                if file_path.suffix in ['.py', '.ipynb']:
-                    imports, has_cuda = self._scan_source_file(file_path)
-                    all_imports.update(imports)
-                    if has_cuda:
-                        cuda_required = True
-                
-                # 2. Collect Config Hints (requirements.txt, etc.)
-                # These are just read as text to provide context for GPT-4 later
-                if file_path.name in ['requirements.txt', 'setup.py', 'pyproject.toml', 'Pipfile']:
-                    content = self._read_file_safe(file_path)
-                    if content:
-                        hint_block = f"--- Content of {file_path.name} ---\n{content[:3000]}\n"
-                        dependency_hints.append(hint_block)
+        source_files, top_level_hints = self._classify_files(file_paths, root_dir)
+        if hint_files is None:
+            hint_files = top_level_hints
 
-            except Exception as e:
-                logger.warning(f"Failed to scan {file_path.name}: {e}")
+        # Config hints are small and capped, so they are read even when the summary is reused
+        self.config_blobs = self._read_hint_files(hint_files)
 
-        # 3. Generate Summary Report
         summary_filename = f"dependency_summary_{project_name}.txt"
         output_path = self.output_dir / summary_filename
 
-        self._write_summary(output_path, all_imports, cuda_required, project_name, dependency_hints)
+        # Reuse the previous summary when none of the scanned files changed since it was written
+        fingerprint = self._fingerprint(source_files + hint_files, project_name)
+        if fingerprint and self._read_fingerprint(output_path) == fingerprint:
+            logger.info(f"♻️  No changes since last scan, reusing {output_path.name}")
+            return output_path
+
+        self._cuda_detected = False
+        self._load_imports_cache()
+
+        # 1. Analyze Source Code (.py & .ipynb)
+        if source_files:
+            all_imports, cuda_required = self.merge(self._map_source_files(source_files))
+            self._save_imports_cache()
+
+        # 2. Generate Summary Report
+        # Config hints (requirements.txt, etc.) go in as read, to provide context for GPT-4 later
+        self._write_summary(output_path, all_imports, cuda_required, project_name, self.config_blobs, fingerprint)
         
         return output_path
 
-    def _scan_source_file(self, file_path: Path) -> Tuple[Set[str], bool]:
+    def _map_source_files(self, source_files: List[Path]) -> Iterator[Tuple[Set[str], bool]]:
+        """
+        Yield scan results for `source_files` in order, on a process pool for large repos and threads otherwise.
+        Results are produced as workers finish, so callers can fold them in without holding them all.
+        """
+        cpu_count = os.cpu_count() or 1
+        done = 0
+        if len(source_files) >= self.PROCESS_POOL_MIN_FILES and cpu_count > 1:
+            try:
+                cache_path = str(self.imports_cache_path) if self.imports_cache_path else None
+                with ProcessPoolExecutor(max_workers=cpu_count, initializer=_init_scan_worker,
+                                         initargs=(str(self.output_dir), cache_path)) as executor:
+                    for result, new_entries in executor.map(_scan_file_in_worker, source_files,
+                                                            chunksize=self.PROCESS_POOL_CHUNKSIZE):
+                        if new_entries:
+                            _IMPORTS_CACHE.update(new_entries)
+                            _NEW_IMPORTS.update(new_entries)
+                        yield result
+                        done += 1
+                return
+            except Exception as e:
+                # e.g. no fork/spawn support in a sandbox, or a worker died; carry on with the rest
+                logger.warning(f"Process pool unavailable ({e}), scanning with threads")
+
+        # File reads release the GIL, so a thread pool overlaps disk latency across files
+        max_workers = min(32, cpu_count * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from executor.map(self._scan_for_summary, source_files[done:])
+
+    @staticmethod
+    def merge(partials: Iterable[Tuple[Set[str], bool]]) -> Tuple[Set[str], bool]:
+        """Fold per-file `scan_one` results (consumed lazily) into (all imports, any file uses CUDA)."""
+        all_imports = set()
+        cuda_required = False
+        for imports, has_cuda in partials:
+            all_imports.update(imports)
+            if has_cuda:
+                cuda_required = True
+        return all_imports, cuda_required
+
+    def _classify_files(self, file_paths: List[Path], root_dir: Path) -> Tuple[List[Path], List[Path]]:
+        """
+        One pass over `file_paths`: (source files to scan, top-level config hints in HINT_FILES order).
+        setup.py is both: its imports are scanned and its text is a hint.
+        """
+        source_files = []
+        hints_by_name = {}
+        hint_names = set(self.HINT_FILES)
+        for path in file_paths:
+            if path.suffix in ('.py', '.ipynb'):
+                source_files.append(path)
+            if path.name in hint_names and path.parent == root_dir:
+                hints_by_name[path.name] = path
+        hint_files = [hints_by_name[name] for name in self.HINT_FILES if name in hints_by_name]
+        return source_files, hint_files
+
+    def _read_hint_files(self, hint_files: List[Path]) -> Dict[str, str]:
+        """Non-empty hint file contents keyed by file name, in `hint_files` order."""
+        blobs = {}
+        for file_path in hint_files:
+            try:
+                content = self._read_file_safe(file_path, max_bytes=self.MAX_HINT_BYTES)
+                if content:
+                    blobs[file_path.name] = content
+            except Exception as e:
+                logger.warning(f"Failed to scan {file_path.name}: {e}")
+        return blobs
+
+    def scan_one(self, file_path: Path) -> Tuple[Set[str], bool]:
+        """
+        Scan a single .py/.ipynb file: (imports, uses CUDA). A failing file yields an empty result
+        instead of raising, so callers can map this over files on their own pool and `merge` the results.
+        """
+        return self._scan_source_file_safe(file_path)
+
+    def _scan_for_summary(self, file_path: Path) -> Tuple[Set[str], bool]:
+        """
+        scan_one for the scan_files loop: once a file of this scan has shown CUDA usage,
+        later files skip the keyword search (the summary only needs "any file").
+        """
+        imports, has_cuda = self._scan_source_file_safe(file_path, cuda_known=self._cuda_detected)
+        if has_cuda:
+            self._cuda_detected = True
+        return imports, has_cuda
+
+    def _scan_source_file_safe(self, file_path: Path, cuda_known: bool = False) -> Tuple[Set[str], bool]:
+        """A failing file must not abort the whole scan. `cuda_known` skips the CUDA keyword search."""
+        try:
+            return self._scan_source_file(file_path, cuda_known)
+        except Exception as e:
+            logger.warning(f"Failed to scan {file_path.name}: {e}")
+            return set(), False
+
+    def _scan_source_file(self, file_path: Path, cuda_known: bool = False) -> Tuple[Set[str], bool]:
         """Dispatches to correct scanner based on file extension."""
         if file_path.suffix == '.ipynb':
-            return self._scan_notebook(file_path)
-        return self._scan_python(file_path)
+            return self._scan_notebook(file_path, cuda_known)
+        return self._scan_python(file_path, cuda_known)
 
-    def _scan_python(self, file_path: Path) -> Tuple[Set[str], bool]:
-        """Extract imports from .py file using AST."""
+    def _scan_python(self, file_path: Path, cuda_known: bool = False) -> Tuple[Set[str], bool]:
+        """Extract imports from .py file."""
         imports = set()
         has_cuda = False
         
@@ -89,105 +273,235 @@ class CodeScannerAgent:
             return imports, has_cuda
 
         # Simple string check for CUDA usage
-        if self._check_cuda_usage(content):
+        if cuda_known or self._check_cuda_usage(content):
             has_cuda = True
 
-        # AST Parsing
+        imports.update(self._extract_imports_cached(content))
+        return imports, has_cuda
+
+    def _extract_imports_cached(self, content: str) -> FrozenSet[str]:
+        """Imports of a Python source, memoized by content digest."""
+        key = hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        imports = _IMPORTS_CACHE.get(key)
+        if imports is None:
+            imports = frozenset(self._extract_python_imports(content))
+            if len(_IMPORTS_CACHE) >= _IMPORTS_CACHE_MAX:
+                _IMPORTS_CACHE.clear()
+                _NEW_IMPORTS.clear()
+            _IMPORTS_CACHE[key] = imports
+            # Only tracked for saving when there is somewhere to save to
+            if self.imports_cache_path is not None:
+                _NEW_IMPORTS[key] = imports
+        return imports
+
+    def _load_imports_cache(self) -> None:
+        """Merge the persistent import cache into memory (once per process and file)."""
+        path = self.imports_cache_path
+        if path is None or str(path) in _LOADED_IMPORT_CACHES:
+            return
+        _LOADED_IMPORT_CACHES.add(str(path))
         try:
-            tree = ast.parse(content)
-            imports.update(self._extract_imports_from_ast(tree))
-        except SyntaxError:
-            logger.debug(f"Syntax error in {file_path.name} (skipping AST)")
-        except Exception:
+            with open(path, 'rb') as f:
+                data = loads_json(f.read())
+            if data.get('version') != self.CACHE_VERSION:
+                return  # written by a different scanner version, results may differ
+            for digest, imports in data.get('imports', {}).items():
+                _IMPORTS_CACHE[bytes.fromhex(digest)] = frozenset(imports)
+        except FileNotFoundError:
             pass
-            
-        return imports, has_cuda
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable import cache {path}: {e}")
+
+    def _save_imports_cache(self) -> None:
+        """Write the in-memory import cache back if this scan added entries (atomic replace)."""
+        path = self.imports_cache_path
+        if path is None or not _NEW_IMPORTS:
+            return
+        _NEW_IMPORTS.clear()
+        # Newest entries last; keep at most _IMPORTS_CACHE_MAX of them
+        entries = list(_IMPORTS_CACHE.items())[-_IMPORTS_CACHE_MAX:]
+        payload = {
+            'version': self.CACHE_VERSION,
+            'imports': {digest.hex(): sorted(imports) for digest, imports in entries},
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not save import cache {path}: {e}")
 
-    def _scan_notebook(self, file_path: Path) -> Tuple[Set[str], bool]:
+    def _extract_python_imports(self, content: str) -> Set[str]:
+        """Imports found by the AST (the source of truth); the line regex only for unparseable sources."""
+        try:
+            return self._extract_imports_from_ast(ast.parse(content))
+        except SyntaxError:
+            # Unparseable (or truncated by MAX_SOURCE_BYTES): the import lines are still usable
+            logger.debug("Syntax error while parsing imports, falling back to regex")
+            return self._extract_imports_from_text(content)
+
+    def _scan_notebook(self, file_path: Path, cuda_known: bool = False) -> Tuple[Set[str], bool]:
         """Extract imports from .ipynb file (Jupyter Notebook)."""
         imports = set()
         has_cuda = False
         
-        content = self._read_file_safe(file_path)
-        if not content:
+        # No cap here: a truncated notebook is invalid JSON
+        raw = self._read_bytes_safe(file_path, max_bytes=None)
+        if not raw:
             return imports, has_cuda
 
         try:
-            notebook = json.loads(content)
-            # Combine all code cells into one string
-            code_content = ""
-            for cell in notebook.get('cells', []):
-                if cell.get('cell_type') == 'code':
-                    code_content += "".join(cell.get('source', [])) + "\n"
+            try:
+                # Parsed straight from bytes: no separate decode pass over (often large) notebooks
+                notebook = loads_json(raw)
+            except ValueError:
+                # Not clean UTF-8: decode leniently, like every other scanned file
+                notebook = loads_json(raw.decode('utf-8', 'ignore'))
+            cells = [
+                "".join(cell.get('source', []))
+                for cell in notebook.get('cells', [])
+                if cell.get('cell_type') == 'code'
+            ]
             
-            if self._check_cuda_usage(code_content):
+            if cuda_known or self._check_cuda_usage("\n".join(cells)):
                 has_cuda = True
                 
-            # Parse the combined code
-            tree = ast.parse(code_content)
-            imports.update(self._extract_imports_from_ast(tree))
+            # Same path as .py files once IPython syntax (%pip, !ls, %%bash cells) is neutralized
+            imports.update(self._extract_imports_cached(self._strip_ipython_syntax(cells)))
             
-        except Exception:
-            # Notebooks often have magic commands (%) that break AST
-            # In a real product, we would clean them, but here we just skip if it fails
-            pass
+        except Exception as e:
+            logger.debug(f"Could not read notebook {file_path.name}: {e}")
             
         return imports, has_cuda
 
+    def _strip_ipython_syntax(self, cells: List[str]) -> str:
+        """
+        Join notebook code cells into parseable Python: cells run by a non-Python cell magic
+        (%%bash, %%html, ...) are dropped, and line magics / shell escapes become `pass`
+        statements (which keeps the surrounding indentation valid).
+        """
+        kept = []
+        for cell in cells:
+            match = self._CELL_MAGIC_RE.match(cell)
+            if match:
+                if match.group(1) not in self.PYTHON_CELL_MAGICS:
+                    continue
+                cell = cell[match.end():]
+            kept.append(cell + "\n")
+        return self._MAGIC_LINE_RE.sub(r'\1pass  # ', "".join(kept))
+
+    def _extract_imports_from_text(self, content: str) -> Set[str]:
+        """Helper to pull top-level module names out of import lines with a regex."""
+        found = set()
+        for match in self._IMPORT_RE.finditer(content):
+            from_module, import_list = match.groups()
+            if from_module:
+                # Relative imports ('from .x import y') yield '' and are skipped
+                modules = [from_module]
+            else:
+                # 'import a.b as c, d' -> ['a.b', 'd']
+                modules = [part.split()[0] for part in import_list.split(',') if part.strip()]
+            for module in modules:
+                top = module.split('.')[0]
+                if top:
+                    found.add(top)
+        return found
+
     def _extract_imports_from_ast(self, tree: ast.AST) -> Set[str]:
-        """Helper to walk AST and find import nodes."""
+        """
+        Helper to find import nodes without visiting every expression (unlike ast.walk):
+        only statement bodies (if/try/with/def/class/loops) are entered, where imports live.
+        """
         found = set()
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                for name in node.names:
-                    found.add(name.name.split('.')[0])
-            elif isinstance(node, ast.ImportFrom):
-                if node.module:
-                    # e.g., 'from sklearn.metrics import ...' -> 'sklearn'
-                    found.add(node.module.split('.')[0])
+        # Explicit stack of statement lists: no recursive call (or generator) per nested body
+        pending = [tree.body]
+        while pending:
+            for node in pending.pop():
+                if isinstance(node, ast.Import):
+                    for name in node.names:
+                        found.add(name.name.split('.')[0])
+                elif isinstance(node, ast.ImportFrom):
+                    if node.module and not node.level:
+                        # e.g., 'from sklearn.metrics import ...' -> 'sklearn'
+                        found.add(node.module.split('.')[0])
+                else:
+                    for field in self._BODY_FIELDS:
+                        nested = getattr(node, field, None)
+                        if nested and isinstance(nested, list):
+                            pending.append(nested)
         return found
 
     def _check_cuda_usage(self, content: str) -> bool:
         """Heuristic check for GPU/CUDA usage."""
-        lower = content.lower()
-        keywords = ['cuda', 'gpu', 'torch.device', 'tensorflow-gpu']
-        return any(k in lower for k in keywords)
+        return self._CUDA_RE.search(content) is not None
+
+    def _read_file_safe(self, path: Path, max_bytes: Optional[int] = MAX_SOURCE_BYTES) -> str:
+        """Reads at most `max_bytes` (None reads the whole file), ignoring decode errors."""
+        return self._read_bytes_safe(path, max_bytes).decode('utf-8', 'ignore')
 
-    def _read_file_safe(self, path: Path) -> str:
+    def _read_bytes_safe(self, path: Path, max_bytes: Optional[int] = MAX_SOURCE_BYTES) -> bytes:
+        """Raw bytes of at most `max_bytes` (None reads the whole file); b"" if unreadable."""
         try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read()
+            with open(path, 'rb') as f:
+                return f.read(max_bytes)
         except:
-            return ""
+            return b""
 
-    def _write_summary(self, path: Path, imports: Set[str], cuda_required: bool, project_name: str, hints: List[str]):
+    def _fingerprint(self, paths: List[Path], project_name: str) -> Optional[str]:
+        """Digest of (path, mtime, size) for every input file; None if a file can't be stat'ed."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{self.CACHE_VERSION}:{project_name}".encode())
+        try:
+            for p in sorted(paths):
+                st = p.stat()
+                h.update(f"\0{p}\0{st.st_mtime_ns}\0{st.st_size}".encode())
+        except OSError:
+            return None
+        return h.hexdigest()
+
+    def _read_fingerprint(self, summary_path: Path) -> Optional[str]:
+        """Fingerprint recorded in the header of an existing summary, if any."""
+        try:
+            with open(summary_path, 'r', encoding='utf-8') as f:
+                for _ in range(4):
+                    line = f.readline()
+                    if line.startswith(self.FINGERPRINT_PREFIX):
+                        return line[len(self.FINGERPRINT_PREFIX):].strip()
+        except OSError:
+            pass
+        return None
+
+    def _write_summary(self, path: Path, imports: Set[str], cuda_required: bool, project_name: str,
+                       hints: Dict[str, str], fingerprint: Optional[str] = None):
         """Saves the analysis result to a text file for the next agent."""
-        # Filter out standard library modules
-        filtered_imports = sorted([
-            imp for imp in imports 
-            if imp not in self.STD_LIB and not imp.startswith('_')
-        ])
-
-        lines = [
-            f"# Dependency Summary for {project_name}",
-            f"# Generated by EnvAgent CodeScanner",
-            "",
-            f"CUDA Required: {'Yes' if cuda_required else 'No'}",
-            "",
-            "## Detected Third-Party Imports (AST Analysis):",
-        ]
-        
-        if filtered_imports:
-            lines.extend([f"- {imp}" for imp in filtered_imports])
-        else:
-            lines.append("(No third-party imports detected)")
-            
-        lines.append("")
-        lines.append("## Configuration File Hints:")
-        if hints:
-            lines.extend(hints)
-        else:
-            lines.append("(No configuration files found)")
-
-        path.write_text('\n'.join(lines), encoding='utf-8')
+        # Filter out standard library modules (one C-level set difference against the prebuilt frozenset)
+        filtered_imports = sorted(imp for imp in imports - self.STD_LIB if not imp.startswith('_'))
+
+        # Stream straight to disk instead of joining one big string (hints can be large)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"# Dependency Summary for {project_name}\n")
+            f.write("# Generated by EnvAgent CodeScanner\n")
+            if fingerprint:
+                f.write(f"{self.FINGERPRINT_PREFIX}{fingerprint}\n")
+            f.write("\n")
+            f.write(f"CUDA Required: {'Yes' if cuda_required else 'No'}\n\n")
+
+            f.write("## Detected Third-Party Imports (AST Analysis):\n")
+            if filtered_imports:
+                f.writelines(f"- {imp}\n" for imp in filtered_imports)
+            else:
+                f.write("(No third-party imports detected)\n")
+
+            f.write("\n## Configuration File Hints:\n")
+            if hints:
+                # Written as fragments: no per-file block string is built
+                for i, (name, content) in enumerate(hints.items()):
+                    if i:
+                        f.write("\n")
+                    f.writelines(("--- Content of ", name, " ---\n", content[:self.MAX_HINT_CHARS], "\n"))
+            else:
+                f.write("(No configuration files found)\n")
+
         logger.info(f"Summary saved to {path}")
\ No newline at end of file
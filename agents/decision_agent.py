@@ -4,14 +4,14 @@ Analyzes project structure, detects Monorepo roots, and decides analysis strateg
 """
 
 import logging
-import json
 import re
 import os
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from openai import OpenAI
+from typing import Dict, Iterator, List, Optional, Any, Set, Tuple
 
-from config.settings import settings
+from utils.helpers import loads_json
+from utils.llm_client import get_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -51,10 +51,40 @@ Output JSON:
 }}
 """
 
+    # Checked in this order; other readme* files (any case) are used only if none of these exist
+    README_NAMES = ('README.md', 'README.txt', 'README')
+
+    # Root detection: how deep to look and which folders never hold a project root
+    MAX_SCAN_DEPTH = 4
+
+    IGNORED_DIRS = {
+        '.git', '.idea', '.vscode', '__pycache__', 
+        'node_modules', 'venv', '.venv', 'env', '.env', 'dist', 'build', '.tox'
+    }
+
+    # Dependency extraction patterns for setup.py / pyproject.toml
+    _INSTALL_REQUIRES_RE = re.compile(r'install_requires\s*=\s*\[(.*?)\]', re.DOTALL)
+    _PYPROJECT_DEPS_RE = re.compile(r'dependencies\s*=\s*\[(.*?)\]', re.DOTALL)
+    _QUOTED_STR_RE = re.compile(r'["\']([^"\']+)["\']')
+
+    # A strong marker (setup.py, pyproject.toml, ...) scores 10; no directory can score above 20
+    STRONG_ROOT_SCORE = 10
+    MAX_ROOT_SCORE = 20
+
     def __init__(self):
-        self.client = OpenAI(api_key=settings.api_key)
+        self.client = None  # created on first LLM call, see _get_client()
+        # Resolved start path -> detected project root (the scoring walk runs once per path)
+        self._root_cache: Dict[Path, Path] = {}
+        # Directory -> README path found by _scan_env_files (None if the directory has none)
+        self._readme_paths: Dict[Path, Optional[str]] = {}
         logger.info("DecisionAgent initialized")
 
+    def _get_client(self):
+        """The shared OpenAI client (created, and the SDK imported, on first use)."""
+        if self.client is None:
+            self.client = get_openai_client()
+        return self.client
+
     # ----------------------------------------------------------------
     # 1. Main Decision Logic
     # ----------------------------------------------------------------
@@ -88,30 +118,23 @@ Output JSON:
         """
         Scoring algorithm to find the 'real' project root.
         Improved: Scans deeper (depth=4) but skips junk folders for speed.
+        Results are memoized per resolved start path.
         """
-        MAX_SCAN_DEPTH = 4 
-        
-        candidates = []
-        
-        IGNORED_DIRS = {
-            '.git', '.idea', '.vscode', '__pycache__', 
-            'node_modules', 'venv', 'env', '.env', 'dist', 'build'
-        }
+        start_path = start_path.resolve()
+        cached = self._root_cache.get(start_path)
+        if cached is not None:
+            return cached
 
-        for root, dirs, files in os.walk(start_path):
-            current = Path(root)
-            
-            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+        best_path = self._score_project_roots(start_path)
+        self._root_cache[start_path] = best_path
+        return best_path
 
-            try:
-                depth = len(current.relative_to(start_path).parts)
-            except ValueError:
-                continue
+    def _score_project_roots(self, start_path: Path) -> Path:
+        """Walks the tree once and returns the highest scoring directory (shallowest path on ties)."""
+        best_key = None  # (-score, path length): smaller is better
+        best_score, best_path = 0, start_path
 
-            if depth > MAX_SCAN_DEPTH:
-                del dirs[:] 
-                continue
-                
+        for current, depth, dirs, files in self._scan_tree(start_path, self.MAX_SCAN_DEPTH):
             score = 0
             if any(f in files for f in ['setup.py', 'pyproject.toml', 'environment.yml', 'conda.yaml']):
                 score += 10
@@ -123,29 +146,86 @@ Output JSON:
 
             if current.name.lower() in ['docs', 'tests', 'examples', 'scripts']:
                 score -= 10
+
+            # Early exit: the start directory already carries a strong marker
+            if depth == 0 and score >= self.STRONG_ROOT_SCORE:
+                return current
             
             if score > 0:
-                candidates.append((score, current))
-        
-        if not candidates:
-            return start_path
-            
-        candidates.sort(key=lambda x: (-x[0], len(str(x[1]))))
-        
-        best_path = candidates[0][1]
+                # Keep only the running best instead of collecting and sorting every candidate;
+                # strict '<' keeps the first one seen on ties, as the stable sort did
+                key = (-score, len(str(current)))
+                if best_key is None or key < best_key:
+                    best_key, best_score, best_path = key, score, current
+                # Nothing can beat a perfect score, stop walking the rest of the tree
+                if score >= self.MAX_ROOT_SCORE:
+                    break
         
         if best_path != start_path:
-            logger.debug(f"Root switched: {start_path} -> {best_path} (Score: {candidates[0][0]})")
+            logger.debug(f"Root switched: {start_path} -> {best_path} (Score: {best_score})")
             
         return best_path
 
+    def _scan_tree(self, root: Path, max_depth: int) -> Iterator[Tuple[Path, int, Set[str], Set[str]]]:
+        """
+        Breadth-first directory walk built on os.scandir.
+        Yields (directory, depth, dir_names, file_names) and reuses the type info
+        cached on each DirEntry, so no extra stat() call is made per entry.
+        """
+        queue = deque([(str(root), 0)])
+
+        while queue:
+            dir_path, depth = queue.popleft()
+            dirnames, filenames = set(), set()
+            subdirs = []
+
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            if entry.name in self.IGNORED_DIRS:
+                                continue
+                            dirnames.add(entry.name)
+                            # Mirror os.walk(followlinks=False): list symlinked dirs but don't enter them
+                            if depth < max_depth and not entry.is_symlink():
+                                subdirs.append(entry.path)
+                        else:
+                            filenames.add(entry.name)
+            except OSError:
+                continue
+
+            yield Path(dir_path), depth, dirnames, filenames
+            queue.extend((sub, depth + 1) for sub in subdirs)
+
     def _scan_env_files(self, path: Path) -> List[Dict]:
-        found = []
-        for name in self.ENV_FILES_PRIORITY:
-            f = path / name
-            if f.exists():
-                found.append({"name": name, "path": str(f), "size": f.stat().st_size})
-        return found
+        """Config files in `path`, in ENV_FILES_PRIORITY order (one directory listing, no per-name probes)."""
+        wanted = set(self.ENV_FILES_PRIORITY)
+        by_name = {}
+        readmes = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    # The same listing also finds the README, so _read_readme needs no probes of its own
+                    if entry.name.lower().startswith('readme') and entry.is_file():
+                        readmes.append(entry.name)
+                    elif entry.name in wanted and entry.is_file():
+                        try:
+                            by_name[entry.name] = {"name": entry.name, "path": entry.path, "size": entry.stat().st_size}
+                        except OSError:
+                            continue
+        except OSError as e:
+            logger.warning(f"Cannot list {path}: {e}")
+            self._readme_paths[path] = None
+            return []
+        self._readme_paths[path] = str(path / min(readmes, key=self._readme_rank)) if readmes else None
+        return [by_name[name] for name in self.ENV_FILES_PRIORITY if name in by_name]
+
+    def _readme_rank(self, name: str) -> Tuple[int, bool, str]:
+        """Sort key: README.md > README.txt > README (exact case first), then any other readme* file."""
+        order = [n.lower() for n in self.README_NAMES]
+        lower = name.lower()
+        position = order.index(lower) if lower in order else len(order)
+        return (position, name not in self.README_NAMES, name)
 
     def _try_fast_track_decision(self, files: List[Dict], target_dir: Path) -> Optional[Dict]:
         """Returns a decision dict if a clear winner exists, else None."""
@@ -172,7 +252,7 @@ Output JSON:
         files_str = "\n".join([f"- {f['name']}" for f in files]) if files else "None"
         
         try:
-            response = self.client.chat.completions.create(
+            response = self._get_client().chat.completions.create(
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "user", "content": self.DECISION_PROMPT.format(
@@ -184,7 +264,7 @@ Output JSON:
                 temperature=0.0,
                 response_format={"type": "json_object"}
             )
-            result = json.loads(response.choices[0].message.content)
+            result = loads_json(response.choices[0].message.content)
             result['target_directory'] = str(target_dir)
             return result
         except Exception as e:
@@ -231,29 +311,30 @@ Output JSON:
 
     def _extract_setup_py_deps(self, content: str) -> str:
         """Extract install_requires from setup.py using regex."""
-        match = re.search(r'install_requires\s*=\s*\[(.*?)\]', content, re.DOTALL)
+        match = self._INSTALL_REQUIRES_RE.search(content)
         if match:
             deps_text = match.group(1)
-            deps = re.findall(r'["\']([^"\']+)["\']', deps_text)
+            deps = self._QUOTED_STR_RE.findall(deps_text)
             return '\n'.join(deps)
         return ""
 
     def _extract_pyproject_deps(self, content: str) -> str:
         """Extract dependencies from pyproject.toml using regex."""
-        match = re.search(r'dependencies\s*=\s*\[(.*?)\]', content, re.DOTALL)
+        match = self._PYPROJECT_DEPS_RE.search(content)
         if match:
             deps_text = match.group(1)
-            deps = re.findall(r'["\']([^"\']+)["\']', deps_text)
+            deps = self._QUOTED_STR_RE.findall(deps_text)
             return '\n'.join(deps)
         return ""
 
     def _read_readme(self, path: Path) -> Optional[str]:
-        for n in ['README.md', 'README.txt', 'README']:
-            p = path / n
-            if p.exists():
-                try: 
-                    return p.read_text(encoding='utf-8', errors='ignore')
-                except: pass
+        if path not in self._readme_paths:
+            self._scan_env_files(path)
+        readme_path = self._readme_paths.get(path)
+        if readme_path:
+            try:
+                return Path(readme_path).read_text(encoding='utf-8', errors='ignore')
+            except: pass
         return None
 
     def _build_response(self, has_setup, type_, file_, target, proceed, reason):
@@ -5,17 +5,16 @@ Environment Builder Agent (OS-Aware & Absolute Path).
 - Robust Logic: Maps packages and infers versions.
 """
 
+import itertools
 import logging
+import os
 import re
-import yaml
 import platform  
 from pathlib import Path
-from typing import Optional, Tuple, Any, Dict
+from typing import Optional, Tuple, Any, Dict, Iterator
 
-from openai import OpenAI
-
-from config.settings import settings
 from utils import sanitize_env_name
+from utils.llm_client import get_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -106,16 +105,40 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
    - No markdown.
 """
 
+    # ---- GPU hints in summaries / collected config files ----
+    # One case-insensitive pass instead of lowering the whole text per keyword ('torch' also covers 'pytorch')
+    _GPU_KEYWORDS_RE = re.compile(r"nvidia|cuda|tensorflow-gpu|torch", re.IGNORECASE)
+
+    # ---- Python version hints in the summary ----
+    _PY_VERSION_HINT_RE = re.compile(r"Python\s+Version\s+Hint:\s*([0-9]+\.[0-9]+)", re.IGNORECASE)
+    _REQUIRES_PYTHON_RE = re.compile(r"Requires-Python:\s*>=\s*([0-9]+\.[0-9]+)", re.IGNORECASE)
+
+    # ---- environment.yml post-processing ----
+    _PYTHON_DEP_RE = re.compile(r"^\s*-\s*python\s*=", re.MULTILINE)
+    _DEPENDENCIES_KEY_RE = re.compile(r"^\s*dependencies:\s*$")
+
+    # ---- Monorepo editable-install injection ----
+    _TOP_LEVEL_DEPS_RE = re.compile(r"^dependencies:\s*(?:#.*)?$")
+    _PIP_HEADER_RE = re.compile(r"^\s*-\s*pip:\s*(?:#.*)?$")
+
+    # ---- Repo scan limits for the Python version heuristic ----
+    MAX_PY_SCAN_BYTES = 256 * 1024  # huge (often generated) files rarely hold match/case
+    _SKIP_SCAN_DIRS = {'__pycache__', 'node_modules', 'venv', 'env', 'site-packages'}
+
     # ---- Heuristic triggers for minimum Python versions ----
-    _PY310_PATTERNS = [
-        re.compile(r"^\s*match\s+.+:\s*$", re.MULTILINE),
-        re.compile(r"^\s*case\s+.+:\s*$", re.MULTILINE),
-    ]
+    # 'match ...:' / 'case ...:' (structural pattern matching) in one pass over the text
+    _PY310_RE = re.compile(r"^\s*(?:match|case)\s+.+:\s*$", re.MULTILINE)
 
     def __init__(self):
-        self.client = OpenAI(api_key=settings.api_key)
+        self.client = None  # created on first LLM call, see _get_client()
         logger.info("EnvironmentBuilder initialized")
 
+    def _get_client(self):
+        """The shared OpenAI client (created, and the SDK imported, on first use)."""
+        if self.client is None:
+            self.client = get_openai_client()
+        return self.client
+
     # ----------------------------
     # Public API
     # ----------------------------
@@ -209,11 +232,21 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
     # Helper: Monorepo Path Injection
     # ----------------------------
     def _inject_relative_path_install(self, yaml_content: str, target_dir: str, root_dir: Optional[str] = None) -> str:
+        # Fast path: patch the text in place (keeps comments and key order, no YAML round-trip)
+        install_cmd = f"-e {str(Path(target_dir).resolve())}"
+        patched = self._patch_pip_install_text(yaml_content, install_cmd)
+        if patched is not None:
+            return patched
+
+        # Fallback: full YAML round-trip for layouts the text patcher doesn't handle
         try:
-            target_path = Path(target_dir).resolve()
-            install_cmd = f"-e {str(target_path)}"
+            import yaml  # only needed for this rewrite, keep it off the import path
+
+            # libyaml C bindings when PyYAML was built with them, pure-Python otherwise
+            loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+            dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 
-            data = yaml.safe_load(yaml_content)
+            data = yaml.load(yaml_content, Loader=loader)
             
             if "dependencies" not in data:
                 data["dependencies"] = []
@@ -234,12 +267,68 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
             if install_cmd not in pip_list:
                 pip_list.append(install_cmd)
             
-            return yaml.dump(data, sort_keys=False)
+            return yaml.dump(data, Dumper=dumper, sort_keys=False)
 
         except Exception as e:
             logger.error(f"Failed to inject absolute path: {e}")
             return yaml_content
 
+    def _patch_pip_install_text(self, yaml_content: str, install_cmd: str) -> Optional[str]:
+        """
+        Adds `install_cmd` to the `- pip:` list (creating it if needed) by editing lines.
+        Drops a relative `-e .` entry. Returns None when the layout is unusual
+        (flow style, no block `dependencies:` list) so the caller can fall back to YAML.
+        """
+        lines = yaml_content.splitlines()
+
+        deps_idx = next((i for i, l in enumerate(lines) if self._TOP_LEVEL_DEPS_RE.match(l)), None)
+        if deps_idx is None:
+            return None
+
+        # The dependencies block ends at the next top-level key
+        end = deps_idx + 1
+        while end < len(lines):
+            line = lines[end]
+            if line.strip() and not line[0].isspace() and not line.startswith(("-", "#")):
+                break
+            end += 1
+
+        items = [i for i in range(deps_idx + 1, end) if lines[i].lstrip().startswith("-")]
+        if not items:
+            return None
+        item_indent = self._indent_of(lines[items[0]])
+
+        pip_idx = next((i for i in items if self._PIP_HEADER_RE.match(lines[i])), None)
+        if pip_idx is None:
+            last = max(i for i in range(deps_idx + 1, end) if lines[i].strip())
+            lines[last + 1:last + 1] = [f"{item_indent}- pip:", f"{item_indent}  - {install_cmd}"]
+            return "\n".join(lines) + "\n"
+
+        # Entries of the pip list are the lines indented deeper than its '- pip:' item
+        pip_indent = len(self._indent_of(lines[pip_idx]))
+        entries = []
+        i = pip_idx + 1
+        while i < len(lines) and (not lines[i].strip() or len(self._indent_of(lines[i])) > pip_indent):
+            if lines[i].strip():
+                entries.append(i)
+            i += 1
+
+        entry_indent = self._indent_of(lines[entries[0]]) if entries else " " * (pip_indent + 2)
+        values = [lines[j].strip()[1:].strip() for j in entries]
+
+        kept = [j for j, value in zip(entries, values) if value != "-e ."]
+        anchor = kept[-1] if kept else pip_idx
+        new_lines = [l for j, l in enumerate(lines) if j not in entries or j in kept]
+        anchor -= sum(1 for j in entries if j not in kept and j < anchor)
+
+        if install_cmd not in values:
+            new_lines.insert(anchor + 1, f"{entry_indent}- {install_cmd}")
+        return "\n".join(new_lines) + "\n"
+
+    @staticmethod
+    def _indent_of(line: str) -> str:
+        return line[:len(line) - len(line.lstrip())]
+
     # ----------------------------
     # Helper: Inference Logic 
     # ----------------------------
@@ -294,15 +383,8 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
         
         # 2. Check for keywords in raw content (from requirements.txt/environment.yml)
         # matches: nvidia-*, tensorflow-gpu, torch(implies gpu potential), cuda
-        has_gpu_keywords = False
-        keywords = ['nvidia', 'cuda', 'tensorflow-gpu', 'torch', 'pytorch']
-        
-        # Simple string search might be enough for warning purposes
-        for kw in keywords:
-            if kw in summary_content.lower():
-                has_gpu_keywords = True
-                break
-                
+        has_gpu_keywords = self._GPU_KEYWORDS_RE.search(summary_content) is not None
+
         needs_gpu = flag_in_summary or has_gpu_keywords
         
         if needs_gpu:
@@ -338,10 +420,10 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
         return "3.11"
 
     def _extract_python_hint_from_summary(self, summary_content: str) -> Optional[str]:
-        m = re.search(r"Python\s+Version\s+Hint:\s*([0-9]+\.[0-9]+)", summary_content, re.IGNORECASE)
+        m = self._PY_VERSION_HINT_RE.search(summary_content)
         if m: return m.group(1)
 
-        m = re.search(r"Requires-Python:\s*>=\s*([0-9]+\.[0-9]+)", summary_content, re.IGNORECASE)
+        m = self._REQUIRES_PYTHON_RE.search(summary_content)
         if m: return m.group(1)
         return None
 
@@ -353,16 +435,17 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
             candidates = []
             for p in [root / "conftest.py", root / "tests"]:
                 if p.exists():
-                    if p.is_file(): candidates.append(p)
-                    else: candidates.extend(list(p.rglob("*.py")))
+                    if p.is_file(): candidates.append(str(p))
+                    else: candidates.extend(self._iter_py_files(str(p)))
 
             if not candidates:
-                candidates = list(root.rglob("*.py"))[:500]
+                candidates = itertools.islice(self._iter_py_files(str(root)), 500)
 
+            # Files are produced lazily, so the walk stops at the first match
             for pyfile in candidates:
                 try:
-                    text = self._read_text(str(pyfile))
-                    if any(rx.search(text) for rx in self._PY310_PATTERNS):
+                    text = self._read_text(pyfile)
+                    if self._PY310_RE.search(text):
                         return "3.10"
                 except Exception:
                     continue
@@ -370,6 +453,26 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
             pass
         return None
 
+    def _iter_py_files(self, top: str) -> Iterator[str]:
+        """os.scandir walk yielding .py paths; skips junk folders and files over MAX_PY_SCAN_BYTES."""
+        stack = [top]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self._SKIP_SCAN_DIRS and not entry.name.startswith('.'):
+                                stack.append(entry.path)
+                        elif entry.name.endswith(".py"):
+                            try:
+                                if entry.stat().st_size > self.MAX_PY_SCAN_BYTES:
+                                    continue
+                            except OSError:  # e.g. broken symlink
+                                continue
+                            yield entry.path
+            except OSError:
+                continue
+
     def _choose_python_version(self, user_version: Optional[str], inferred_version: str) -> str:
         if not user_version: return inferred_version
         try:
@@ -387,7 +490,7 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
     # LLM + YAML post-processing
     # ----------------------------
     def _call_llm(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+        response = self._get_client().chat.completions.create(
             model="gpt-4-turbo-preview",
             messages=[
                 {"role": "system", "content": "You are a Conda expert. You ALWAYS map 'torch' to 'pytorch' and 'opencv-python' to 'opencv'. Output ONLY valid YAML."},
@@ -398,7 +501,7 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
         return response.choices[0].message.content.strip()
 
     def _ensure_python_dep(self, env_yaml: str, python_version: str) -> str:
-        if re.search(r"^\s*-\s*python\s*=", env_yaml, re.MULTILINE):
+        if self._PYTHON_DEP_RE.search(env_yaml):
             return env_yaml
 
         lines = env_yaml.splitlines()
@@ -406,7 +509,7 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
         inserted = False
         for idx, line in enumerate(lines):
             out.append(line)
-            if not inserted and re.match(r"^\s*dependencies:\s*$", line):
+            if not inserted and self._DEPENDENCIES_KEY_RE.match(line):
                 out.append(f"  - python={python_version}")
                 inserted = True
 
@@ -429,6 +532,21 @@ Your task is to convert existing environment file(s) into a unified Conda `envir
             return f.read()
 
     def save_to_file(self, content: str, output_path: str) -> None:
-        with open(output_path, "w", encoding="utf-8") as f:
+        """
+        Write `content` to `output_path`, skipping the write when the file already holds it
+        (e.g. a fixer retry that returned the same YAML). Writes go through a temp file and
+        os.replace, so conda never reads a half-written file.
+        """
+        path = Path(output_path)
+        try:
+            if path.stat().st_size == len(content.encode("utf-8")) and path.read_text(encoding="utf-8") == content:
+                logger.info(f"Environment.yml unchanged: {output_path}")
+                return
+        except (OSError, UnicodeDecodeError):
+            pass  # missing or unreadable: just write it
+
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
             f.write(content)
+        os.replace(tmp_path, path)
         logger.info(f"Environment.yml saved to: {output_path}")
\ No newline at end of file
@@ -3,13 +3,18 @@ Environment Fixer Agent.
 Uses OpenAI GPT-4 to fix conda environment errors.
 """
 
+import hashlib
+import json
 import logging
 import re
-from openai import OpenAI
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from config.settings import settings
 from utils.memory import Memory
-from typing import Any
+from utils.llm_cache import ResponseCache
+from utils.llm_client import get_openai_client
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -19,27 +24,21 @@ class EnvironmentFixer:
 
     # -------------------------------------------------------------------------
     # 🧠 INTELLIGENT AGENT PROMPT (Context-Aware Inference)
+    # Static rulebook first (system message), per-attempt data last (user message):
+    # an identical prefix on every retry lets the API reuse its prompt cache.
     # -------------------------------------------------------------------------
-    FIX_PROMPT = """You are an expert DevOps Engineer specializing in Python environments.
+    FIX_SYSTEM_PROMPT = """You are a Python Dependency Expert and an expert DevOps Engineer specializing in Python environments.
 A conda environment creation FAILED.
 Your goal is to fix the `environment.yml` not just by reacting to errors, but by **INFERRING the correct project context**.
+ANALYZE the error message carefully. Be surgical - only change what's necessary.
 
 ### 💻 EXECUTION CONTEXT (CRITICAL)
-- **Current Hardware:** {system_context}
+- The current hardware is given in the EXECUTION CONTEXT section of the request.
 - **Rule:** If the hardware is **Apple Silicon (M1/M2/M3/M4)**:
   1. **Conflict Resolution:** If a package fails to build or install, try switching channel to `conda-forge`.
   2. **Binary Preference:** For `dlib`, `numpy`, `scipy`, `pandas`, ALWAYS use `conda` packages (avoid pip build errors).
   3. **Python Version:** Prefer 3.10 or 3.11 over 3.9 for better ARM64 support.
 
-## 📄 CURRENT environment.yml:
-{current_yml}
-
-## ❌ ERROR LOG:
-{error_message}
-
-## 📜 FIX HISTORY:
-{error_history}
-
 ## 🧠 INTELLIGENT REASONING STRATEGY:
 
 ### 1. 🕵️‍♂️ INFER PYTHON VERSION (Dynamic & Intelligent)
@@ -77,20 +76,94 @@ Your goal is to fix the `environment.yml` not just by reacting to errors, but by
 3. NO Explanations or Comments.
 """
 
+    FIX_USER_TEMPLATE = """### 💻 EXECUTION CONTEXT
+- **Current Hardware:** {system_context}
+
+## 📄 CURRENT environment.yml:
+{current_yml}
+
+## ❌ ERROR LOG:
+{error_message}
+
+## 📜 FIX HISTORY:
+{error_history}
+"""
+
+    # Error log budget for the prompt: conda/pip logs can run to megabytes, and the
+    # actionable lines sit at the start (command, first failure) and the end (final error)
+    MAX_ERROR_HEAD_CHARS = 2000
+    MAX_ERROR_TAIL_CHARS = 6000
+
+    # Fallback classification of the error log (one scan instead of one per keyword)
+    _SOLVER_ERR_RE = re.compile(r"LibMambaUnsatisfiableError|UnsatisfiableError|conflicts")
+    # Version specifier separators ('pkg==1.0', 'pkg>=1', 'pkg=1.0', ...)
+    _SEP_RE = re.compile(r"==|>=|<=|!=|~=|=")
+    # Leading package name of a dependency entry ('numpy' in 'numpy>=1.2', '-e' in '-e .')
+    _PKG_NAME_RE = re.compile(r"[A-Za-z0-9_.\-]+")
+
+    # ---- Known errors with deterministic fixes (tried before any AI call) ----
+    # pip wheel build failures: "Failed building wheel for dlib", "Failed to build dlib",
+    # "Failed to build installable wheels for some pyproject.toml based projects (dlib)"
+    _WHEEL_FAILURE_RE = re.compile(
+        r"Failed to build installable wheels[^(\n]*\(([^)]+)\)|Failed building wheel for ([\w.\-]+)|Failed to build ([\w.\- ]+)"
+    )
+    # pip name (normalized) -> conda package providing a prebuilt binary
+    CONDA_BINARY_PACKAGES = {
+        'dlib': 'dlib', 'numpy': 'numpy', 'scipy': 'scipy', 'pandas': 'pandas',
+        'scikit-learn': 'scikit-learn', 'pillow': 'pillow', 'face-recognition': 'face_recognition',
+        'opencv-python': 'opencv', 'opencv-python-headless': 'opencv', 'h5py': 'h5py',
+        'lxml': 'lxml', 'matplotlib': 'matplotlib', 'psycopg2': 'psycopg2', 'pyyaml': 'pyyaml',
+    }
+    # (error pattern, rewrite method); a method returns the fixed YAML, or None if it doesn't apply
+    KNOWN_FIXES = (
+        (_WHEEL_FAILURE_RE, '_move_failed_wheels_to_conda'),
+    )
+
+    # ---- Remembered fixes: error signature -> dependency edits that resolved it ----
+    # Lines of an error log that identify the failure, and the parts of them that differ
+    # between runs/machines (paths, versions, counts) and are masked out of the signature
+    _ERROR_LINE_RE = re.compile(r"error|failed|conflict|not found|unsatisfiable|could not", re.IGNORECASE)
+    _VOLATILE_PATH_RE = re.compile(r"(?:[A-Za-z]:)?[\\/][^\s'\"]+")
+    _VOLATILE_NUM_RE = re.compile(r"\d+(?:\.\d+)*")
+    MAX_SIGNATURE_LINES = 20
+
+    # One temperature per parallel candidate (settings.MAX_PARALLEL_FIXES of them are used)
+    CANDIDATE_TEMPERATURES = (0.2, 0.4, 0.6, 0.8)
+
     def __init__(self):
-        """Initialize the EnvironmentFixer with OpenAI client."""
-        self.client = OpenAI(api_key=settings.api_key)
+        """Initialize the EnvironmentFixer (the OpenAI client is created lazily)."""
+        self.client = None  # created on first LLM call, see _get_client()
+        # Verified fixes from earlier runs for the exact same (yml, error, hardware) are reused without an API call
+        self.cache = ResponseCache(settings.cache_dir / "fixer.db", ttl=settings.LLM_CACHE_TTL)
+        # Dependency edits that resolved an error before, replayed when the same error shows up again
+        self.fix_patterns = ResponseCache(settings.cache_dir / "fix_patterns.db", ttl=settings.FIX_PATTERN_TTL)
         logger.info("EnvironmentFixer initialized")
 
+    def _get_client(self):
+        """The shared OpenAI client (created, and the SDK imported, on first use)."""
+        if self.client is None:
+            self.client = get_openai_client()
+        return self.client
+
     def fix(self, current_yml: str, error_message: str, memory: Memory, system_context: Any = "Unknown") -> str:
         """
         Generate a fixed environment.yml based on the error.
         """
         logger.info("=" * 70)
         logger.info("🔧 FIXER AGENT STARTING DIAGNOSIS...")
-        logger.info(f"   Context: {system_context}")
+        logger.info("   Context: %s", system_context)
         logger.info("=" * 70)
 
+        # 0. Known error patterns are fixed by rule, without a round-trip to the AI
+        known_fix = self._apply_known_fixes(current_yml, error_message)
+        if known_fix is not None:
+            return known_fix
+
+        # 0b. An error we've fixed before (in any project) gets the same dependency edits
+        remembered_fix = self._apply_remembered_fix(current_yml, error_message)
+        if remembered_fix is not None:
+            return remembered_fix
+
         # 1. Prepare History Context
         error_history_text = "None - this is the first attempt"
         if memory.error_history:
@@ -101,46 +174,300 @@ Your goal is to fix the `environment.yml` not just by reacting to errors, but by
             error_history_text = "\n".join(history_lines)
 
         # 2. Build Prompt
-        prompt = self.FIX_PROMPT.format(
+        prompt = self.FIX_USER_TEMPLATE.format(
             system_context=system_context, # Context Injection
             current_yml=current_yml,
-            error_message=error_message,
+            error_message=self._clip_error(error_message),
             error_history=error_history_text
         )
 
+        cached_yml = self.cache.get(self._cache_key(current_yml, error_message, system_context))
+        # An entry that doesn't change the YAML would only repeat the failed attempt
+        if cached_yml and not self._are_yamls_identical(cached_yml, current_yml):
+            logger.info("♻️  Reusing a fix that resolved this exact error before")
+            return cached_yml
+
         try:
             logger.info("🤖 AI is analyzing dependencies to infer the best environment configuration...")
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a Python Dependency Expert. ANALYZE the error message carefully. For Apple Silicon (M1/M2/M4), prioritize 'conda-forge' and binary packages. Be surgical - only change what's necessary."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.2,
-            )
-
-            fixed_yml = response.choices[0].message.content.strip()
-            fixed_yml = self._clean_markdown(fixed_yml)
+            fixed_yml = self._request_fix_candidates(prompt, current_yml)
 
             # 3. Validation
-            if self._are_yamls_identical(current_yml, fixed_yml):
+            if fixed_yml is None:
                 logger.warning("⚠️  AI suggested no changes. Engaging Rule-Based Fallback Protocol...")
                 fixed_yml = self._heuristic_fallback(current_yml, error_message)
 
+            # Not cached yet: remember_fix stores it once the next attempt shows it worked
             return fixed_yml
 
         except Exception as e:
-            logger.error(f"❌ AI Inference Failed: {e}")
+            logger.error("❌ AI Inference Failed: %s", e)
             logger.info("Engaging Rule-Based Fallback Protocol...")
             return self._heuristic_fallback(current_yml, error_message)
 
+    def _request_fix_candidates(self, prompt: str, current_yml: str) -> Optional[str]:
+        """
+        Ask for settings.MAX_PARALLEL_FIXES candidate fixes at once (one temperature each) and
+        return the first one that actually changes the YAML; None if none does.
+        Raises the last API error if every request failed.
+        """
+        temperatures = self.CANDIDATE_TEMPERATURES[:max(1, settings.MAX_PARALLEL_FIXES)]
+        client = self._get_client()  # build it once, before the worker threads need it
+
+        executor = ThreadPoolExecutor(max_workers=len(temperatures))
+        futures = [executor.submit(self._request_fix, client, prompt, t) for t in temperatures]
+        last_error = None
+        unchanged = 0
+        try:
+            for future in as_completed(futures):
+                try:
+                    fixed_yml = future.result()
+                except Exception as e:
+                    logger.warning("Fix candidate failed: %s", e)
+                    last_error = e
+                    continue
+                if not self._are_yamls_identical(current_yml, fixed_yml):
+                    return fixed_yml
+                unchanged += 1
+        finally:
+            # Don't wait for slower candidates once one is usable
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        if unchanged == 0 and last_error is not None:
+            raise last_error
+        return None
+
+    def _request_fix(self, client: Any, prompt: str, temperature: float) -> str:
+        response = client.chat.completions.create(
+            model="gpt-4-turbo-preview",
+            messages=[
+                {
+                    "role": "system",
+                    "content": self.FIX_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=temperature,
+        )
+        return self._clean_markdown(response.choices[0].message.content.strip())
+
+    def _apply_known_fixes(self, yml: str, error: str) -> Optional[str]:
+        """First KNOWN_FIXES rewrite that matches the error and changes the YAML, else None."""
+        for pattern, method_name in self.KNOWN_FIXES:
+            match = pattern.search(error)
+            if not match:
+                continue
+            fixed = getattr(self, method_name)(yml, error)
+            if fixed is not None and fixed != yml:
+                logger.info("⚡ Known error pattern (%s), applied rule-based fix without AI", method_name)
+                return fixed
+        return None
+
+    def _move_failed_wheels_to_conda(self, yml: str, error: str) -> Optional[str]:
+        """Move pip packages whose wheel failed to build into the conda dependencies (prebuilt binaries)."""
+        failed = set()
+        for match in self._WHEEL_FAILURE_RE.finditer(error):
+            for group in match.groups():
+                if group:
+                    failed.update(self._normalize_pkg_name(n) for n in re.split(r"[\s,]+", group) if n)
+        failed &= self.CONDA_BINARY_PACKAGES.keys()
+        if not failed:
+            return None
+
+        out = []
+        moved = []
+        conda_names = set()
+        pip_index = None
+        pip_indent = ""
+        in_pip_section = False
+        for line in yml.split('\n'):
+            indent, is_bullet, rest = self._tokenize_yml_line(line)
+            if is_bullet and rest.startswith("pip:"):
+                in_pip_section = True
+                pip_index, pip_indent = len(out), indent
+                out.append(line)
+                continue
+            if in_pip_section and rest and len(indent) <= len(pip_indent):
+                in_pip_section = False
+
+            name_match = self._PKG_NAME_RE.match(rest) if is_bullet else None
+            if name_match:
+                name = self._normalize_pkg_name(name_match.group(0))
+                if in_pip_section and name in failed:
+                    moved.append(name)
+                    continue
+                if not in_pip_section:
+                    conda_names.add(name)
+            out.append(line)
+
+        if not moved:
+            return None
+
+        # Drop the 'pip:' header if nothing is left under it
+        following = next((l for l in out[pip_index + 1:] if l.strip()), "")
+        if len(following) - len(following.lstrip()) <= len(pip_indent):
+            del out[pip_index]
+
+        additions = []
+        for name in moved:
+            conda_name = self.CONDA_BINARY_PACKAGES[name]
+            if self._normalize_pkg_name(conda_name) not in conda_names:
+                conda_names.add(self._normalize_pkg_name(conda_name))
+                additions.append(f"{pip_indent}- {conda_name}")
+        out[pip_index:pip_index] = additions
+
+        logger.info("💡 Moving %s from pip to conda (prebuilt binaries)", ", ".join(moved))
+        return '\n'.join(out)
+
+    def error_signature(self, error: str) -> Optional[str]:
+        """
+        Stable id of an error: its error lines with paths and numbers masked, hashed.
+        None if no line looks like an error (nothing to remember it by).
+        """
+        seen = set()
+        lines = []
+        for line in error.splitlines():
+            if not self._ERROR_LINE_RE.search(line):
+                continue
+            line = self._VOLATILE_PATH_RE.sub("PATH", line)
+            line = " ".join(self._VOLATILE_NUM_RE.sub("N", line).split())
+            if line not in seen:
+                seen.add(line)
+                lines.append(line)
+                if len(lines) >= self.MAX_SIGNATURE_LINES:
+                    break
+        if not lines:
+            return None
+        return hashlib.sha256("\n".join(lines).encode("utf-8", "ignore")).hexdigest()
+
+    def _cache_key(self, yml: str, error: str, system_context: Any) -> str:
+        """Exact-match cache key: the YAML and the error text as the model sees it (head + tail)."""
+        return self.cache.make_key(
+            "v2", self._normalize_yml(yml), self._clip_error(error), str(system_context)
+        )
+
+    def remember_fix(self, error: str, original_yml: str, fixed_yml: str, system_context: Any = "Unknown") -> None:
+        """
+        Record `fixed_yml` as the fix for `error` on `original_yml`: as an exact-match cache entry,
+        and as dependency edits to replay on the same error elsewhere.
+        Call it once the fix is known to have worked (the next attempt no longer hits this error).
+        A "fix" that left the YAML as it was proves nothing (the error may just have been flaky)
+        and is not recorded.
+        """
+        if self._are_yamls_identical(original_yml, fixed_yml):
+            return
+        self.cache.put(self._cache_key(original_yml, error, system_context), fixed_yml)
+
+        signature = self.error_signature(error)
+        delta = self._dependency_delta(original_yml, fixed_yml)
+        if signature and delta:
+            self.fix_patterns.put(signature, json.dumps(delta))
+
+    def _apply_remembered_fix(self, yml: str, error: str) -> Optional[str]:
+        """Replay a remembered fix for this error, if it applies cleanly to `yml`; else None."""
+        signature = self.error_signature(error)
+        stored = self.fix_patterns.get(signature) if signature else None
+        if not stored:
+            return None
+        try:
+            fixed = self._apply_dependency_delta(yml, json.loads(stored))
+        except (ValueError, TypeError, KeyError) as e:
+            logger.debug("Ignoring unreadable remembered fix: %s", e)
+            return None
+        if fixed is None or fixed == yml:
+            return None
+        logger.info("⚡ Seen this error before, re-applied the fix that resolved it without AI")
+        return fixed
+
+    def _dependency_entries(self, yml: str) -> List[Tuple[int, str, str]]:
+        """(line index, 'conda' or 'pip', spec) for every dependency bullet of an environment.yml."""
+        entries = []
+        top_key = None
+        pip_indent = None
+        for i, line in enumerate(yml.split("\n")):
+            indent, is_bullet, rest = self._tokenize_yml_line(line)
+            if not rest or rest.startswith("#"):
+                continue
+            if not indent and not is_bullet:
+                top_key = rest.split(":", 1)[0].strip()
+                pip_indent = None
+                continue
+            if top_key != "dependencies" or not is_bullet:
+                continue
+            if pip_indent is not None and len(indent) <= pip_indent:
+                pip_indent = None
+            if rest.startswith("pip:"):
+                pip_indent = len(indent)
+                continue
+            entries.append((i, "pip" if pip_indent is not None else "conda", rest))
+        return entries
+
+    def _dependency_delta(self, original_yml: str, fixed_yml: str) -> Optional[Dict[str, List[List[str]]]]:
+        """Dependency entries removed/added between two YAMLs; None if the dependencies didn't change."""
+        before = Counter((section, spec) for _, section, spec in self._dependency_entries(original_yml))
+        after = Counter((section, spec) for _, section, spec in self._dependency_entries(fixed_yml))
+        removed = sorted((before - after).elements())
+        added = sorted((after - before).elements())
+        if not removed and not added:
+            return None
+        return {"remove": [list(e) for e in removed], "add": [list(e) for e in added]}
+
+    def _apply_dependency_delta(self, yml: str, delta: Dict[str, List[List[str]]]) -> Optional[str]:
+        """
+        Apply a _dependency_delta to `yml`. Returns None unless every removed entry is present
+        (the remembered fix was made for this same dependency) and every addition has a place to go.
+        """
+        lines = yml.split("\n")
+        entries = self._dependency_entries(yml)
+        to_remove = Counter(tuple(e) for e in delta["remove"])
+        present = {(section, spec) for _, section, spec in entries}
+        to_add = [tuple(e) for e in delta["add"] if tuple(e) not in present]
+
+        drop = set()
+        last_line = {}  # section -> index of its last remaining entry
+        for i, section, spec in entries:
+            if to_remove[(section, spec)] > 0:
+                to_remove[(section, spec)] -= 1
+                drop.add(i)
+            else:
+                last_line[section] = i
+        if +to_remove:
+            return None  # this YAML doesn't have what the fix removed
+
+        # New entries go right after the last kept entry of their section, with its indentation
+        inserts = {}
+        for section, spec in to_add:
+            anchor = last_line.get(section)
+            if anchor is None:
+                return None
+            indent = self._tokenize_yml_line(lines[anchor])[0]
+            inserts.setdefault(anchor, []).append(f"{indent}- {spec}")
+
+        fixed_lines = []
+        for i, line in enumerate(lines):
+            if i not in drop:
+                fixed_lines.append(line)
+            fixed_lines.extend(inserts.get(i, ()))
+        return "\n".join(fixed_lines)
+
+    @staticmethod
+    def _normalize_pkg_name(name: str) -> str:
+        return name.lower().replace("_", "-")
+
+    def _clip_error(self, error: str) -> str:
+        """Keep the head and tail of an oversized error log, dropping the middle."""
+        limit = self.MAX_ERROR_HEAD_CHARS + self.MAX_ERROR_TAIL_CHARS
+        if len(error) <= limit:
+            return error
+        omitted = len(error) - limit
+        return (f"{error[:self.MAX_ERROR_HEAD_CHARS]}\n"
+                f"[... {omitted} characters omitted ...]\n"
+                f"{error[-self.MAX_ERROR_TAIL_CHARS:]}")
+
     def _clean_markdown(self, text: str) -> str:
         if "```" in text:
             lines = text.split("\n")
@@ -148,71 +475,95 @@ Your goal is to fix the `environment.yml` not just by reacting to errors, but by
             return "\n".join(lines).strip()
         return text
 
+    def _normalize_yml(self, yml: str) -> str:
+        """Strip blank lines, comments and surrounding whitespace (keeps line order)."""
+        return "\n".join(line.strip() for line in yml.strip().split("\n") if line.strip() and not line.strip().startswith("#"))
+
     def _are_yamls_identical(self, yml1: str, yml2: str) -> bool:
+        # Equal line multisets always give equal xor-hashes, so a mismatch settles "different" without building anything
+        if self._fast_yml_hash(yml1) != self._fast_yml_hash(yml2):
+            return False
+
+        # Order-insensitive: compare the lines as multisets (hashing, no sort or join)
         def normalize(yml):
-            lines = [line.strip() for line in yml.strip().split("\n") if line.strip() and not line.strip().startswith("#")]
-            return "\n".join(sorted(lines))
+            return Counter(line.strip() for line in yml.strip().split("\n") if line.strip() and not line.strip().startswith("#"))
         return normalize(yml1) == normalize(yml2)
 
+    @staticmethod
+    def _fast_yml_hash(yml: str) -> int:
+        """Order-insensitive hash of the non-blank, non-comment lines (xor of per-line hashes)."""
+        h = 0
+        for line in yml.split("\n"):
+            stripped = line.strip()
+            if stripped and not stripped.startswith("#"):
+                h ^= hash(stripped)
+        return h
+
     def _heuristic_fallback(self, yml: str, error: str) -> str:
         """Rule-Based Fallback: When AI fails, apply aggressive hard rules."""
         logger.info("🔧 [FALLBACK] Applying Aggressive Safety Net Rules...")
 
-        lines = yml.split('\n')
+        is_solver_error = self._SOLVER_ERR_RE.search(error) is not None
+
+        # Every rule below relaxes constraints for the solver; other errors leave the file as is
+        if not is_solver_error:
+            return yml
+
         fixed_lines = []
         in_pip_section = False
 
-        is_build_error = any(x in error for x in ["gcc", "g++", "Python.h", "build", "wheel", "cmake"])
-        is_solver_error = any(x in error for x in ["LibMambaUnsatisfiableError", "UnsatisfiableError", "conflicts"])
-
-        for line in lines:
-            stripped = line.strip()
+        # Single pass: each line is split once into (indent, is_bullet, rest) and classified by its package name
+        for line in yml.split('\n'):
+            indent, is_bullet, rest = self._tokenize_yml_line(line)
 
-            if stripped.startswith("- pip:"):
+            if is_bullet and rest.startswith("pip:"):
                 in_pip_section = True
                 fixed_lines.append(line)
                 continue
-                
-            if in_pip_section and stripped and not line.startswith(" ") and not line.startswith("\t"):
+
+            if in_pip_section and rest and not indent:
                 in_pip_section = False
 
-            if not stripped or stripped.startswith("#"):
+            name_match = self._PKG_NAME_RE.match(rest) if is_bullet else None
+            if name_match is None:
+                # Blank lines, comments, keys like 'channels:'
                 fixed_lines.append(line)
                 continue
+            name = name_match.group(0)
 
-            if stripped.startswith("- python"):
-                if is_solver_error and ("=" in stripped or ">" in stripped or "<" in stripped):
-                    indent = line[:line.find("-")]
+            if name == "python":
+                if any(c in rest for c in "=<>"):
                     logger.info("💡 [FALLBACK] Removing Python version constraint")
                     fixed_lines.append(f"{indent}- python")
                 else:
                     fixed_lines.append(line)
                 continue
-            
-            # Relax standard packages (non-pip)
-            if (is_solver_error and not in_pip_section and stripped.startswith("-") and ":" not in stripped and not stripped.startswith("- -e")):
-                indent = line[:line.find("-")]
-                pkg_line = stripped[1:].strip()
-                pkg_name = pkg_line
-                for sep in ["==", ">=", "<=", "!=", "~=", "="]:
-                    if sep in pkg_name:
-                        pkg_name = pkg_name.split(sep)[0].strip()
-                        break
-                
-                if " " in pkg_name and not pkg_name.startswith("-"):
-                    pkg_name = pkg_name.split()[0].strip()
-
-                if pkg_name:
-                    new_line = f"{indent}- {pkg_name}"
-                    fixed_lines.append(new_line)
-                    if line.strip() != new_line.strip():
-                         logger.info(f"💡 [FALLBACK] Relaxing constraint: {line.strip()} -> {pkg_name}")
-                else:
-                    fixed_lines.append(line)
-            else:
+
+            # Relax standard packages (non-pip); editable installs and 'channel::pkg' specs stay as is
+            if in_pip_section or ":" in rest or name.startswith("-"):
                 fixed_lines.append(line)
+                continue
+
+            pkg_name = self._SEP_RE.split(rest, 1)[0].strip()
+            if " " in pkg_name:
+                pkg_name = pkg_name.split()[0]
+
+            new_line = f"{indent}- {pkg_name}"
+            fixed_lines.append(new_line)
+            if rest != pkg_name:
+                logger.info("💡 [FALLBACK] Relaxing constraint: %s -> %s", line.strip(), pkg_name)
         
         return '\n'.join(fixed_lines)
 
+    @staticmethod
+    def _tokenize_yml_line(line: str) -> Tuple[str, bool, str]:
+        """'  - numpy==1.0' -> ('  ', True, 'numpy==1.0'); '  key: v' -> ('  ', False, 'key: v')."""
+        body = line.lstrip()
+        indent = line[:len(line) - len(body)]
+        body = body.rstrip()
+        if body.startswith("-"):
+            return indent, True, body[1:].strip()
+        return indent, False, body
+
     def extract_fix_summary(self, original_yml: str, fixed_yml: str) -> str:
         return "AI applied fixes based on error log." # Simplified for brevity
\ No newline at end of file
@@ -4,6 +4,7 @@ Loads environment variables and API keys.
 """
 
 import os
+from pathlib import Path
 from typing import Optional
 from dotenv import load_dotenv
 
@@ -17,6 +18,15 @@ class Settings:
     # Maximum number of retry attempts for fixing conda environment errors
     MAX_RETRIES: int = 8
 
+    # Candidate fixes requested concurrently per failed attempt (first useful answer wins)
+    MAX_PARALLEL_FIXES: int = 2
+
+    # How long cached LLM answers stay valid (seconds)
+    LLM_CACHE_TTL: int = 86400
+
+    # How long a fix that resolved an error is remembered for reuse on the same error (seconds)
+    FIX_PATTERN_TTL: int = 30 * 86400
+
     def __init__(self):
         """Initialize settings by loading from environment variables."""
         self.openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
@@ -28,6 +38,11 @@ class Settings:
                 "See .env.example for reference."
             )
 
+        # On-disk caches (LLM responses, ...); override with ENVAGENT_CACHE_DIR
+        self.cache_dir: Path = Path(
+            os.getenv("ENVAGENT_CACHE_DIR") or Path.home() / ".cache" / "envagent"
+        ).expanduser()
+
     @property
     def api_key(self) -> str:
         """Get the OpenAI API key."""
@@ -6,7 +6,6 @@ Refactored for Clean Code & Readability.
 
 import argparse
 import logging
-import os
 import sys
 from pathlib import Path
 
@@ -16,15 +15,27 @@ from utils.system_checker import SystemChecker
 from utils.file_filter import FileFilter
 from utils import CondaExecutor, sanitize_env_name
 
-# Agents
+# Agents (the others are imported by the step that needs them)
 from agents.decision_agent import DecisionAgent
-from agents.code_scanner import CodeScannerAgent
-from agents.env_builder import EnvironmentBuilder
-from agents.env_fixer import EnvironmentFixer
-from utils.memory import Memory
 
 # --- Setup & Helpers ---
 
+class _Log:
+    """Collects console lines and writes them with one stdout write (one per burst, not per line)."""
+
+    def __init__(self):
+        self._lines = []
+
+    def add(self, msg: str = "") -> None:
+        self._lines.append(msg)
+
+    def flush(self) -> None:
+        """Write the collected lines; call before any slow work so progress stays visible."""
+        if self._lines:
+            sys.stdout.write("\n".join(self._lines) + "\n")
+            sys.stdout.flush()
+            self._lines.clear()
+
 def setup_logging() -> None:
     logging.basicConfig(
         level=logging.INFO,
@@ -56,22 +67,24 @@ def run_system_check() -> dict:
     Returns: The detected system details dictionary with GPU info.
     """
     print("🔍 Step 0/6: Checking system requirements...")
-    checker = SystemChecker()
+    checker = SystemChecker(cache_path=str(settings.cache_dir / "system.json"))
     passed, msgs, system_info = checker.run_all_checks()
     
+    log = _Log()
     for msg in msgs:
-        print(f"   {msg}")
+        log.add(f"   {msg}")
+    if not passed:
+        log.add("❌ System check failed.")
+    log.flush()
 
     if not passed:
-        print("❌ System check failed.")
         sys.exit(1)
     
     return system_info
 
-def analyze_structure(root_path: Path) -> dict:
+def analyze_structure(root_path: Path, agent: DecisionAgent) -> dict:
     """Step 1: Determine project structure (Monorepo detection)."""
     print("📋 Step 1/6: Analyzing project structure...")
-    agent = DecisionAgent()
     decision = agent.decide(str(root_path))
     
     target_dir = Path(decision.get('target_directory', root_path))
@@ -83,18 +96,20 @@ def analyze_structure(root_path: Path) -> dict:
     decision['target_path_obj'] = target_dir 
     return decision
 
-def process_existing_files(decision: dict, project_name: str, py_version: str, root_path: Path, output_path: Path, system_context: dict) -> str:
+def process_existing_files(decision: dict, agent: DecisionAgent, project_name: str, py_version: str, root_path: Path, output_path: Path, system_context: dict) -> str:
     """Case A: Handle projects with existing setup files."""
-    print("\n" + "=" * 60)
-    print("✅ Valid environment setup found!")
-    print("=" * 60)
+    log = _Log()
+    log.add("\n" + "=" * 60)
+    log.add("✅ Valid environment setup found!")
+    log.add("=" * 60)
+    log.flush()
     
     target_dir = decision['target_path_obj']
-    agent = DecisionAgent()
     
     collected_content = agent.collect_env_files_content(str(target_dir))
     
     print("\n🔨 Generating environment.yml...")
+    from agents.env_builder import EnvironmentBuilder
     builder = EnvironmentBuilder()
     env_content = builder.build_from_existing_files(
         collected_content=collected_content,
@@ -111,6 +126,9 @@ def process_existing_files(decision: dict, project_name: str, py_version: str, r
 
 def process_deep_analysis(target_dir: Path, output_dir: Path, project_name: str, py_version: str, output_path: Path, system_context: dict) -> str:
     """Case B: Deep scan of source code."""
+    from agents.code_scanner import CodeScannerAgent
+    from agents.env_builder import EnvironmentBuilder
+
     print(f"\n   ✓ Proceeding with code analysis in: {target_dir.name}")
 
     # Step 2
@@ -125,7 +143,7 @@ def process_deep_analysis(target_dir: Path, output_dir: Path, project_name: str,
 
     # Step 3
     print("\n🔬 Step 3/6: Scanning files for dependencies...")
-    scanner = CodeScannerAgent(output_dir=str(output_dir))
+    scanner = CodeScannerAgent(output_dir=str(output_dir), imports_cache_path=str(settings.cache_dir / "imports.json"))
     summary_path = scanner.scan_files(relevant_files, target_dir, project_name=project_name)
     print(f"   ✓ Summary saved to: {summary_path.name}")
 
@@ -145,6 +163,10 @@ def process_deep_analysis(target_dir: Path, output_dir: Path, project_name: str,
 
 def create_environment_with_retry(env_name: str, output_path: Path, initial_yml: str, system_context: dict) -> None:
     """Step 5: Create environment with self-healing loop."""
+    from agents.env_builder import EnvironmentBuilder
+    from agents.env_fixer import EnvironmentFixer
+    from utils.memory import Memory
+
     print(f"\n🚀 Step 5/6: Creating conda environment '{env_name}'...")
     
     executor = CondaExecutor()
@@ -158,25 +180,35 @@ def create_environment_with_retry(env_name: str, output_path: Path, initial_yml:
     current_yml = initial_yml
     error_history = []
     memory = Memory()
+    pending_fix = None  # (error, yml before, yml after, context) of the last fix, until we know if it worked
 
     for attempt in range(1, settings.MAX_RETRIES + 1):
         print(f"   [Attempt {attempt}/{settings.MAX_RETRIES}]")
         
         success, error = executor.create_environment(str(output_path), env_name)
 
+        # A fix "worked" once its error is gone; only then is it remembered for future runs
+        if pending_fix and (success or fixer.error_signature(error) != fixer.error_signature(pending_fix[0])):
+            fixer.remember_fix(*pending_fix)
+        pending_fix = None
+
+        log = _Log()
         if success:
-            print("\n" + "=" * 60)
-            print("✅ SUCCESS! Environment created.")
-            print("=" * 60)
-            print(f"Activate: conda activate {env_name}")
+            log.add("\n" + "=" * 60)
+            log.add("✅ SUCCESS! Environment created.")
+            log.add("=" * 60)
+            log.add(f"Activate: conda activate {env_name}")
+            log.flush()
             return 
 
-        print(f"   ❌ Failed: {error[:200]}...")
+        log.add(f"   ❌ Failed: {error[:200]}...")
         if attempt == settings.MAX_RETRIES:
-            print("❌ Final failure: Max retries reached.")
+            log.add("❌ Final failure: Max retries reached.")
+            log.flush()
             sys.exit(1)
             
-        print(f"   🔧 Applying fix...")
+        log.add(f"   🔧 Applying fix...")
+        log.flush()
         memory.error_history = error_history
 
         try:
@@ -185,6 +217,7 @@ def create_environment_with_retry(env_name: str, output_path: Path, initial_yml:
             builder.save_to_file(fixed_yml, str(output_path))
             
             fix_summary = fixer.extract_fix_summary(current_yml, fixed_yml)
+            pending_fix = (error, current_yml, fixed_yml, system_context)
             current_yml = fixed_yml
             error_history.append((error, fix_summary))
         except Exception as e:
@@ -196,21 +229,26 @@ def create_environment_with_retry(env_name: str, output_path: Path, initial_yml:
 def main() -> None:
     setup_logging()
     
-    print("=" * 60)
-    print("EnvAgent - Conda Environment Generator v2.1")
-    print("Monorepo Support & Auto-Discovery Enabled")
-    print("=" * 60)
-    print()
+    log = _Log()
+    log.add("=" * 60)
+    log.add("EnvAgent - Conda Environment Generator v2.1")
+    log.add("Monorepo Support & Auto-Discovery Enabled")
+    log.add("=" * 60)
+    log.add()
+    log.flush()
 
     args = parse_arguments()
     root_path = validate_directory(args.source)
     output_path = Path(args.destination).resolve()
-    os.makedirs(output_path.parent, exist_ok=True)
+    if not output_path.parent.is_dir():
+        output_path.parent.mkdir(parents=True)
     
     # 1. Run System Check & Capture Hardware Context
     system_context = run_system_check()
     
-    decision = analyze_structure(root_path)
+    # One DecisionAgent per run so its root-detection cache is shared between steps
+    decision_agent = DecisionAgent()
+    decision = analyze_structure(root_path, decision_agent)
     target_dir = decision['target_path_obj']
     
     project_name = args.env_name if args.env_name else root_path.name
@@ -218,7 +256,7 @@ def main() -> None:
     
     # 2. Generate YAML Content
     if decision["has_env_setup"] and not decision["proceed_with_analysis"]:
-        env_content = process_existing_files(decision, project_name, args.python_version, root_path, output_path, system_context)
+        env_content = process_existing_files(decision, decision_agent, project_name, args.python_version, root_path, output_path, system_context)
     else:
         # Pass system_context to deep analysis (Builder Agent)
         env_content = process_deep_analysis(
@@ -235,8 +273,9 @@ def main() -> None:
         # Pass system_context to Fixer Agent
         create_environment_with_retry(sanitized_name, output_path, env_content, system_context)
     else:
-        print("\n✅ Skipped creation (--no-create).")
-        print(f"Run: conda env create -f {output_path}")
+        log.add("\n✅ Skipped creation (--no-create).")
+        log.add(f"Run: conda env create -f {output_path}")
+        log.flush()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,7 +5,7 @@ Contains utilities for file reading and memory management.
 
 from .memory import Memory
 from .conda_executor import CondaExecutor
-from .helpers import sanitize_env_name, extract_imports, map_import_to_package, IMPORT_TO_PACKAGE
+from .helpers import sanitize_env_name, extract_imports, map_import_to_package, IMPORT_TO_PACKAGE, loads_json
 from .system_checker import SystemChecker
 from .file_filter import FileFilter
 
@@ -17,6 +17,7 @@ __all__ = [
     "extract_imports",
     "map_import_to_package",
     "IMPORT_TO_PACKAGE",
+    "loads_json",
     "SystemChecker",
     "FileFilter",
     "DependencyCollector"
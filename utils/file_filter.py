@@ -8,7 +8,7 @@ to optimize processing speed and token usage.
 import logging
 import os
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterator, List
 
 logger = logging.getLogger(__name__)
 
@@ -88,8 +88,13 @@ class FileFilter:
         """
         Determine if a specific file should be included in analysis.
         """
-        file_name = file_path.name
-        file_ext = file_path.suffix.lower()
+        return self._should_include_name(file_path.name, file_path.stat)
+
+    def _should_include_name(self, file_name: str, stat: Callable[[], os.stat_result]) -> bool:
+        """
+        Same rules as _should_include_file, on a bare name; `stat` is only called for the size check.
+        """
+        file_ext = os.path.splitext(file_name)[1].lower()
 
         # 1. Always include priority configuration files
         if file_name in self.ALWAYS_INCLUDE:
@@ -107,7 +112,7 @@ class FileFilter:
 
         # 4. Check file size (Skip overly large files)
         try:
-            if file_path.stat().st_size > self.max_file_size_bytes:
+            if stat().st_size > self.max_file_size_bytes:
                 logger.debug(f"Skipping large file: {file_name}")
                 return False
         except OSError:
@@ -116,10 +121,49 @@ class FileFilter:
 
         return True
 
+    def iter_relevant_files(self, project_dir: Path) -> Iterator[Path]:
+        """
+        Yield relevant files under `project_dir` (unsorted, top-down like os.walk).
+        Walks with os.scandir so directory/file checks and the size check use the
+        directory entries instead of extra stat calls per path.
+        """
+        stack = [str(project_dir)]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError as e:
+                logger.debug(f"Cannot list directory {current}: {e}")
+                continue
+
+            subdirs = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+
+                if is_dir:
+                    # [Early Pruning Optimization]
+                    # Excluded directories (node_modules, .git, ...) are never entered;
+                    # like os.walk, symlinked directories are not followed.
+                    if not self._should_exclude_dir_name(entry.name) and not entry.is_symlink():
+                        subdirs.append(entry.path)
+                    continue
+
+                try:
+                    if self._should_include_name(entry.name, entry.stat):
+                        yield Path(entry.path)
+                except Exception as e:
+                    logger.warning(f"Error checking file {entry.name}: {e}")
+
+            # Reversed so the stack visits subdirectories in listing order
+            stack.extend(reversed(subdirs))
+
     def get_relevant_files(self, project_path: str) -> List[Path]:
         """
         Scan the project directory and return a list of relevant files.
-        Uses os.walk with in-place list modification for 'Early Pruning'.
 
         Args:
             project_path: The root directory to scan.
@@ -128,28 +172,12 @@ class FileFilter:
             List[Path]: A sorted list of relevant file paths.
         """
         project_dir = Path(project_path).resolve()
-        relevant_files = []
 
         if not project_dir.exists():
             logger.error(f"Project path does not exist: {project_path}")
             return []
 
-        # Walk the directory tree
-        for root, dirs, files in os.walk(str(project_dir)):
-            # [Early Pruning Optimization]
-            # Modify 'dirs' list in-place to prevent os.walk from entering excluded directories.
-            # This significantly speeds up scanning by skipping node_modules, .git, etc.
-            dirs[:] = [d for d in dirs if not self._should_exclude_dir_name(d)]
-
-            for file in files:
-                file_path = Path(root) / file
-                
-                try:
-                    if self._should_include_file(file_path):
-                        relevant_files.append(file_path)
-                except Exception as e:
-                    logger.warning(f"Error checking file {file}: {e}")
-                    continue
+        relevant_files = list(self.iter_relevant_files(project_dir))
 
         # Sort files to prioritize dependency definitions
         # Order: 
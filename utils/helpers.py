@@ -2,8 +2,14 @@
 Helper utility functions for EnvAgent.
 """
 
+import json
 import re
-from typing import Set
+from typing import Any, Set, Union
+
+try:
+    import orjson as _orjson  # optional, several times faster than the stdlib decoder
+except ImportError:
+    _orjson = None
 
 
 def sanitize_env_name(name: str) -> str:
@@ -198,3 +204,21 @@ def map_import_to_package(import_name: str) -> str:
         'numpy'
     """
     return IMPORT_TO_PACKAGE.get(import_name, import_name)
+
+
+def loads_json(data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document, using orjson when it is installed.
+
+    Args:
+        data: JSON text (str, or UTF-8 bytes)
+
+    Returns:
+        The decoded Python object
+
+    Raises:
+        ValueError: If the data is not valid JSON (or not valid UTF-8)
+    """
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,81 @@
+"""
+Persistent cache for LLM responses.
+Stores answers in a small SQLite database so repeated prompts (e.g. re-running
+EnvAgent on the same project) skip the network round-trip.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Exact-match response cache backed by SQLite, with a time-to-live per entry."""
+
+    def __init__(self, path: Path, ttl: float = 86400):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.enabled = True
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, ts REAL NOT NULL, hits INTEGER DEFAULT 0)"
+                )
+        except (OSError, sqlite3.Error) as e:
+            # A cache that can't be opened must not stop the run
+            logger.warning(f"Response cache disabled ({self.path}): {e}")
+            self.enabled = False
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Stable key for a combination of prompt inputs."""
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(part.encode("utf-8", "ignore"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached value for `key`, or None if missing or expired."""
+        if not self.enabled:
+            return None
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute(
+                    "SELECT value FROM responses WHERE key = ? AND ts >= ?",
+                    (key, time.time() - self.ttl),
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE responses SET hits = hits + 1 WHERE key = ?", (key,))
+                return row[0]
+        except sqlite3.Error as e:
+            logger.debug(f"Response cache read failed: {e}")
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        """Store `value` under `key` and drop expired entries."""
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, ts, hits) VALUES (?, ?, ?, 0)",
+                    (key, value, now),
+                )
+                conn.execute("DELETE FROM responses WHERE ts < ?", (now - self.ttl,))
+        except sqlite3.Error as e:
+            logger.debug(f"Response cache write failed: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call keeps the cache safe to use from any thread
+        return sqlite3.connect(str(self.path), timeout=5)
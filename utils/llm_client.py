@@ -0,0 +1,26 @@
+"""
+Shared OpenAI client.
+All agents use one client so its HTTP connection pool (and the TLS sessions in it)
+is reused across agents instead of being rebuilt by each of them.
+"""
+
+import threading
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    """
+    Return the process-wide OpenAI client, creating it on first use.
+    The SDK import is deferred until then because it is slow, and the settings
+    import because it requires OPENAI_API_KEY.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from config.settings import settings
+                from openai import OpenAI
+                _client = OpenAI(api_key=settings.api_key)
+    return _client
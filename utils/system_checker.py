@@ -3,29 +3,92 @@ System Checker - Pre-flight system validation.
 No LLM calls, just pure Python checks.
 """
 
+import json
 import logging
+import os
 import shutil
 import subprocess
 import platform
-from typing import Tuple, List
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Tuple, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# run_all_checks report lines
+_MSG_SYSTEM = "💻 System Detected: {}"
+_MSG_NVIDIA_GPU = "   🎮 NVIDIA GPU Detected: {} (Driver: {})"
+_MSG_MACOS_GPU = "   🍎 macOS GPU Detected: {} (Metal: {})"
+_MSG_NO_GPU = "   ⚠️  No active GPU detected (Code analysis will determine needs)"
+_MSG_APPLE_SILICON = "   👉 Apple Silicon detected. Will prioritize 'conda-forge'."
+_MARK_OK, _MARK_FAIL, _MARK_WARN = "✓", "✗", "⚠"
+
+
+def _which_any(names: Tuple[str, ...]) -> Optional[str]:
+    """
+    Like shutil.which for several names at once: one pass over PATH, trying every
+    name in each directory. Returns the first executable found, or None.
+    """
+    if os.name == "nt":
+        exts = [""] + [ext for ext in os.environ.get("PATHEXT", ".EXE;.BAT;.CMD").lower().split(os.pathsep) if ext]
+    else:
+        exts = [""]
+    for directory in os.environ.get("PATH", os.defpath).split(os.pathsep):
+        if not directory:
+            continue
+        for name in names:
+            for ext in exts:
+                candidate = os.path.join(directory, name + ext)
+                if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                    return candidate
+    return None
+
 
 class SystemChecker:
     """Performs system pre-flight checks before starting analysis."""
 
-    def __init__(self):
+    # Probe results stored in the cache file stay valid this long (seconds)
+    CACHE_TTL = 86400
+    CACHE_VERSION = 1
+
+    # Present on Linux only while the NVIDIA kernel driver is loaded
+    NVIDIA_DRIVER_PROC = "/proc/driver/nvidia/version"
+    SYSCTL_PATH = "/usr/sbin/sysctl"
+
+    # "Chipset Model: Apple M4" / "Metal Support: Metal 3" lines of the text system_profiler report
+    _GPU_TEXT_RE = re.compile(r"^\s*(Chipset Model|Metal Support):[ \t]*(.+)$", re.MULTILINE)
+
+    def __init__(self, cache_path: Optional[str] = None):
+        """
+        `cache_path` (optional) is a JSON file where the hardware/conda probe results are kept
+        between runs, so a warm run skips those subprocess calls.
+        """
         self.os_type = platform.system()
-        self.chip_info = self._get_detailed_chip_info()
+        self._chip_info = None
+        self.cache_path = Path(cache_path) if cache_path else None
+
+    @property
+    def chip_info(self) -> str:
+        """Chip description, probed on first use (run_all_checks probes it alongside the other checks)."""
+        if self._chip_info is None:
+            self._chip_info = self._get_detailed_chip_info()
+        return self._chip_info
 
     def _get_detailed_chip_info(self) -> str:
         """Detect specific chip model (e.g., Apple M4)."""
         if self.os_type == "Darwin":
             try:
-                # macOS specific command to get CPU brand
-                command = ["sysctl", "-n", "machdep.cpu.brand_string"]
-                chip = subprocess.check_output(command).decode().strip()
+                # macOS specific: CPU brand, straight from libc (no sysctl process)
+                chip = self._sysctl_string("machdep.cpu.brand_string")
+                if chip is None:
+                    # Absolute path: no PATH lookup, and the timeout keeps a stuck call from hanging Step 0
+                    command = [self.SYSCTL_PATH, "-n", "machdep.cpu.brand_string"]
+                    result = subprocess.run(command, capture_output=True, text=True, timeout=2)
+                    if result.returncode != 0:
+                        return f"macOS ({platform.machine()})"
+                    chip = result.stdout.strip()
                 return f"macOS ({platform.machine()}) - {chip}"
             except Exception:
                 return f"macOS ({platform.machine()})"
@@ -34,8 +97,31 @@ class SystemChecker:
         else:
             return f"{self.os_type} ({platform.machine()})"
 
+    @staticmethod
+    def _sysctl_string(name: str) -> Optional[str]:
+        """String sysctl value via libc's sysctlbyname (BSD/macOS), or None if unavailable."""
+        try:
+            import ctypes
+            import ctypes.util
+
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            size = ctypes.c_size_t(256)
+            buf = ctypes.create_string_buffer(size.value)
+            if libc.sysctlbyname(name.encode(), buf, ctypes.byref(size), None, ctypes.c_size_t(0)) != 0:
+                return None
+            value = buf.value.decode(errors="replace").strip()
+            return value or None
+        except (OSError, AttributeError):
+            return None
+
     def check_nvidia_gpu(self) -> dict:
         """Check for NVIDIA GPU using nvidia-smi."""
+        # Starting nvidia-smi is slow; skip it where no NVIDIA driver can be present
+        if self.os_type == "Darwin":
+            return None
+        if self.os_type == "Linux" and not os.path.exists(self.NVIDIA_DRIVER_PROC):
+            return None
+
         try:
             # query-gpu=name,driver_version,memory.total
             cmd = ["nvidia-smi", "--query-gpu=name,driver_version,memory.total", "--format=csv,noheader"]
@@ -62,30 +148,30 @@ class SystemChecker:
         return None
 
     def check_macos_gpu(self) -> dict:
-        """Check for macOS GPU using system_profiler."""
+        """Check for macOS GPU using system_profiler (JSON output, text output on old macOS)."""
         if self.os_type != "Darwin":
             return None
+
+        # Apple Silicon always has its own integrated, Metal-capable GPU named after the chip,
+        # so the slow system_profiler probe is only needed on Intel Macs
+        if platform.machine() == "arm64":
+            brand = self._sysctl_string("machdep.cpu.brand_string")
+            if brand and brand.startswith("Apple"):
+                return {"type": "apple_silicon", "name": brand, "metal": "Supported"}
             
         try:
-            # Get display info in JSON format (more reliable if available, but parsing text is safer across versions)
-            # We'll use text parsing for broader compatibility or try JSON if possible.
-            # Let's use simple grep for basic info first to avoid huge output parsing
-            cmd = ["system_profiler", "SPDisplaysDataType"]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
+            cmd = ["system_profiler", "-json", "SPDisplaysDataType"]
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+
             if result.returncode == 0:
-                output = result.stdout
-                # Naive parse for Chipset / Metal Support
-                gpu_name = "Unknown"
-                metal_support = "Unknown"
-                
-                for line in output.split('\n'):
-                    line = line.strip()
-                    if line.startswith("Chipset Model:"):
-                        gpu_name = line.replace("Chipset Model:", "").strip()
-                    elif line.startswith("Metal Support:"):
-                        metal_support = line.replace("Metal Support:", "").strip()
-                
+                try:
+                    gpu_name, metal_support = self._parse_displays_json(result.stdout)
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                    # -json is not supported before macOS 10.15; fall back to the text report
+                    cmd = ["system_profiler", "SPDisplaysDataType"]
+                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+                    gpu_name, metal_support = self._parse_displays_text(result.stdout)
+
                 if gpu_name != "Unknown":
                     return {
                         "type": "apple_silicon" if "Apple" in gpu_name else "amd/intel", 
@@ -97,14 +183,42 @@ class SystemChecker:
             
         return None
 
+    @staticmethod
+    def _parse_displays_json(output: str) -> Tuple[str, str]:
+        """(gpu_name, metal_support) from `system_profiler -json SPDisplaysDataType`."""
+        gpu = json.loads(output)["SPDisplaysDataType"][0]
+        gpu_name = gpu.get("sppci_model", "Unknown")
+        # Key and value names vary by macOS version, e.g. "spdisplays_metal3"
+        metal_support = (gpu.get("spdisplays_mtlgpufamilysupport")
+                         or gpu.get("spdisplays_metalfamily")
+                         or gpu.get("spdisplays_metal")
+                         or "Unknown")
+        if metal_support.startswith("spdisplays_"):
+            metal_support = metal_support[len("spdisplays_"):].replace("metal", "Metal ").strip()
+        return gpu_name, metal_support
+
+    @staticmethod
+    def _parse_displays_text(output: str) -> Tuple[str, str]:
+        """(gpu_name, metal_support) from the plain `system_profiler SPDisplaysDataType` report."""
+        fields = {"Chipset Model": "Unknown", "Metal Support": "Unknown"}
+        for match in SystemChecker._GPU_TEXT_RE.finditer(output):
+            fields[match.group(1)] = match.group(2).strip()
+        return fields["Chipset Model"], fields["Metal Support"]
+
     def check_conda_installed(self) -> Tuple[bool, str]:
         """
         Check if conda is installed and accessible.
         """
         try:
-            if not (shutil.which("conda") or shutil.which("mamba")):
+            conda_path = _which_any(("conda", "mamba"))
+            if not conda_path:
                 return False, "Conda is not installed or not in PATH."
 
+            # Reading the version from the install metadata avoids starting conda's interpreter
+            version = self._read_conda_version(os.environ.get("CONDA_EXE") or conda_path)
+            if version:
+                return True, f"Conda installed: conda {version}"
+
             result = subprocess.run(
                 ["conda", "--version"],
                 capture_output=True,
@@ -124,17 +238,41 @@ class SystemChecker:
             logger.error(f"Error checking conda: {e}")
             return False, f"Error checking conda: {str(e)}"
 
+    @staticmethod
+    def _read_conda_version(conda_exe: Optional[str]) -> Optional[str]:
+        """
+        Conda version from `<prefix>/conda-meta/conda-<version>-<build>.json`, where
+        the prefix is two levels above the conda executable (bin/, condabin/, Scripts/).
+        Returns None if it can't be determined this way.
+        """
+        if not conda_exe:
+            return None
+        try:
+            meta_dir = Path(conda_exe).resolve().parent.parent / "conda-meta"
+            for record in meta_dir.glob("conda-[0-9]*.json"):
+                # "conda-25.7.0-py311h06a4308_0" -> "25.7.0"
+                return record.stem[len("conda-"):].rsplit("-", 1)[0]
+        except OSError:
+            pass
+        return None
+
     def check_disk_space(self, required_gb: float = 5.0) -> Tuple[bool, str]:
-        """Check if enough disk space available."""
+        """Check if enough disk space available on the volume that will hold the environment."""
+        # New envs go under the active conda prefix; outside conda, measure the working directory
+        path = os.environ.get("CONDA_PREFIX") or "."
         try:
-            stat = shutil.disk_usage(".")
-            free_gb = stat.free / (1024 ** 3)
+            if hasattr(os, "statvfs"):
+                st = os.statvfs(path)
+                free_gb = (st.f_bavail * st.f_frsize) / (1024 ** 3)
+            else:  # Windows
+                free_gb = shutil.disk_usage(path).free / (1024 ** 3)
 
             if free_gb >= required_gb:
                 return True, f"Disk space: {free_gb:.1f} GB available"
             else:
                 return False, f"Insufficient disk space: {free_gb:.1f} GB available"
-        except Exception:
+        except OSError as e:
+            logger.warning(f"Disk space check failed for {path}: {e}")
             return True, "Disk space check skipped"
 
     def check_python_version(self) -> Tuple[bool, str]:
@@ -155,7 +293,35 @@ class SystemChecker:
         """
         messages = []
         all_passed = True
-        
+
+        cached = self.load_cached()
+        if cached:
+            # Hardware and conda don't change between runs; only free disk space is re-checked
+            self._chip_info = cached["chip"]
+            nvidia_gpu = cached["nvidia_gpu"]
+            macos_gpu = cached["macos_gpu"]
+            conda_result = tuple(cached["conda"])
+            disk_result = self.check_disk_space()
+        else:
+            # The probes are independent subprocess calls, so run them side by side:
+            # the step then takes as long as the slowest probe instead of their sum.
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                chip_future = executor.submit(self._get_detailed_chip_info)
+                nvidia_future = executor.submit(self.check_nvidia_gpu)
+                macos_future = executor.submit(self.check_macos_gpu) if self.os_type == "Darwin" else None
+                conda_future = executor.submit(self.check_conda_installed)
+                disk_future = executor.submit(self.check_disk_space)
+
+                self._chip_info = chip_future.result()
+                nvidia_gpu = nvidia_future.result()
+                macos_gpu = macos_future.result() if macos_future else None
+                conda_result = conda_future.result()
+                disk_result = disk_future.result()
+
+            # A failed conda check is not cached, so installing conda is picked up on the next run
+            if conda_result[0]:
+                self._save_cache(nvidia_gpu, macos_gpu, conda_result)
+
         system_details = {
             "os": self.os_type,
             "chip": self.chip_info,
@@ -163,37 +329,100 @@ class SystemChecker:
         }
 
         # 1. System Context Detection
-        messages.append(f"💻 System Detected: {self.chip_info}")
-        
-        # Check for GPU
-        nvidia_gpu = self.check_nvidia_gpu()
-        macos_gpu = self.check_macos_gpu()
+        messages.append(_MSG_SYSTEM.format(self.chip_info))
         
         if nvidia_gpu:
             system_details['gpu'] = nvidia_gpu
             gpu_names = ", ".join([g['name'] for g in nvidia_gpu['details']])
-            messages.append(f"   🎮 NVIDIA GPU Detected: {gpu_names} (Driver: {nvidia_gpu['details'][0]['driver']})")
+            messages.append(_MSG_NVIDIA_GPU.format(gpu_names, nvidia_gpu['details'][0]['driver']))
         elif macos_gpu:
             system_details['gpu'] = macos_gpu
-            messages.append(f"   🍎 macOS GPU Detected: {macos_gpu['name']} (Metal: {macos_gpu['metal']})")
+            messages.append(_MSG_MACOS_GPU.format(macos_gpu['name'], macos_gpu['metal']))
         else:
-            messages.append("   ⚠️  No active GPU detected (Code analysis will determine needs)")
+            messages.append(_MSG_NO_GPU)
 
         if "Apple" in self.chip_info and "M" in self.chip_info:
-             messages.append("   👉 Apple Silicon detected. Will prioritize 'conda-forge'.")
+             messages.append(_MSG_APPLE_SILICON)
+
+        # 2-4. Python, Conda (required) and Disk (warning only) checks
+        checks = (
+            (self.check_python_version(), True),
+            (conda_result, True),
+            (disk_result, False),
+        )
+        for (success, msg), required in checks:
+            messages.append((_MARK_OK if success else _MARK_FAIL if required else _MARK_WARN) + " " + msg)
+            if required and not success:
+                all_passed = False
+
+        return all_passed, messages, system_details
 
-        # 2. Python Check
-        success, msg = self.check_python_version()
-        messages.append(("✓" if success else "✗") + f" {msg}")
-        if not success: all_passed = False
+    def _cache_host_key(self) -> List[str]:
+        """Cached probes are only reused on the same machine and kernel."""
+        return [platform.node(), platform.release()]
 
-        # 3. Conda Check
-        success, msg = self.check_conda_installed()
-        messages.append(("✓" if success else "✗") + f" {msg}")
-        if not success: all_passed = False
+    def load_cached(self) -> Optional[dict]:
+        """
+        Probe results saved by an earlier run, or None if there is no cache,
+        it is older than CACHE_TTL, or it was written on another host/kernel.
+        """
+        if self.cache_path is None:
+            return None
+        try:
+            if time.time() - self.cache_path.stat().st_mtime > self.CACHE_TTL:
+                return None
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != self.CACHE_VERSION or data.get("host") != self._cache_host_key():
+                return None
+            if not self._is_valid_cache(data):
+                logger.debug(f"Ignoring incomplete system check cache {self.cache_path}")
+                return None
+            return data
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, AttributeError) as e:
+            logger.debug(f"Ignoring system check cache {self.cache_path}: {e}")
+            return None
 
-        # 4. Disk Check
-        success, msg = self.check_disk_space()
-        messages.append(("✓" if success else "⚠") + f" {msg}")
+    @staticmethod
+    def _is_valid_cache(data: dict) -> bool:
+        """True if `data` has every field run_all_checks reads, with the types it expects."""
+        nvidia_gpu = data.get("nvidia_gpu")
+        macos_gpu = data.get("macos_gpu")
+        conda = data.get("conda")
+        if not isinstance(data.get("chip"), str):
+            return False
+        if not (isinstance(conda, list) and len(conda) == 2
+                and isinstance(conda[0], bool) and isinstance(conda[1], str)):
+            return False
+        if nvidia_gpu is not None:
+            details = nvidia_gpu.get("details") if isinstance(nvidia_gpu, dict) else None
+            if not (isinstance(details, list) and details
+                    and all(isinstance(g, dict) and "name" in g and "driver" in g for g in details)):
+                return False
+        if macos_gpu is not None:
+            if not (isinstance(macos_gpu, dict) and "name" in macos_gpu and "metal" in macos_gpu):
+                return False
+        return "nvidia_gpu" in data and "macos_gpu" in data
 
-        return all_passed, messages, system_details
\ No newline at end of file
+    def _save_cache(self, nvidia_gpu: Optional[dict], macos_gpu: Optional[dict], conda_result: Tuple[bool, str]) -> None:
+        """Store the probe results for load_cached (atomic replace)."""
+        if self.cache_path is None:
+            return
+        data = {
+            "version": self.CACHE_VERSION,
+            "host": self._cache_host_key(),
+            "chip": self._chip_info,
+            "nvidia_gpu": nvidia_gpu,
+            "macos_gpu": macos_gpu,
+            "conda": list(conda_result),
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.debug(f"Could not save system check cache {self.cache_path}: {e}")